@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.fake_bot_api import FakeBotAPIServer
+
+
+# Запуск: python -m benchmarks.e2e_load [--users 100] [--json result.json]
+# Бот работает целиком (polling, FSM, обработчики, БД) против локального
+# Bot API и временных SQLite-баз вместо MySQL
+
+SCORE_STEPS = [
+    ("pick_subject", "callback", "sub_rus"),
+    ("score", "message", "85"),
+    ("pick_subject", "callback", "sub_math_prof"),
+    ("score", "message", "90"),
+    ("pick_subject", "callback", "sub_inf"),
+    ("score", "message", "95"),
+]
+BULK_SCORE_STEPS = [
+    ("bulk_scores", "message", "рус 85, мат_проф 90, инф 95"),
+]
+
+
+def user_flow(bulk_scores, specialization, university_id):
+    return [
+        ("start", "message", "/start"),
+        ("change_data", "message", "Внести данные"),
+        ("scores_menu", "message", "Баллы ЕГЭ"),
+        *(BULK_SCORE_STEPS if bulk_scores else SCORE_STEPS),
+        ("save", "callback", "save"),
+        ("specialization_menu", "message", "Специальность вуза"),
+        ("specialization", "callback", specialization),
+        ("main_menu", "message", "Вернуться в начало"),
+        ("search", "message", "Начать поиск"),
+        ("budget", "message", "Бюджет"),
+        ("page", "callback", "page_1"),
+        ("page", "callback", "page_0"),
+        ("university", "callback", f"university_{university_id}"),
+    ]
+
+
+class UpdateFactory:
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def build(self, user_id, kind, payload):
+        update_id = next(self._ids)
+        user = {"id": user_id, "is_bot": False, "first_name": "load"}
+        chat = {"id": user_id, "type": "private"}
+        if kind == "message":
+            return update_id, {
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": chat,
+                    "from": user,
+                    "text": payload,
+                },
+            }
+        return update_id, {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "chat_instance": str(user_id),
+                "from": user,
+                "data": payload,
+                "message": {
+                    "message_id": 1,
+                    "date": int(time.time()),
+                    "chat": chat,
+                    "from": {"id": 42, "is_bot": True, "first_name": "Fake"},
+                    "text": "…",
+                },
+            },
+        }
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(int(round(q * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def summarize(latencies):
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+async def seed_universities(count, rng):
+    from src.db.models import Base, Moscow
+    from src.db.universities import engine
+    from src.utils.specializations import SPECIALIZATION_BITS
+
+    bits = list(SPECIALIZATION_BITS.values())
+    rows = []
+    for i in range(1, count + 1):
+        bud_score = rng.randint(120, 300)
+        pay_score = rng.randint(100, bud_score)
+        mask = 0
+        for bit in rng.sample(bits, 3):
+            mask |= bit
+        rows.append(
+            {
+                "ID": i,
+                "name": f"Университет {i}",
+                "coast": f"{rng.randint(100, 500)} 000 ₽",
+                "bud_places": f"{rng.randint(0, 300)} мест",
+                "pay_places": f"{rng.randint(0, 300)} мест",
+                "bud_score": f"от {bud_score}",
+                "pay_score": f"от {pay_score}",
+                "url": f"https://example.com/{i}",
+                "bud_score_num": float(bud_score),
+                "pay_score_num": float(pay_score),
+                "specialization_mask": mask,
+            }
+        )
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(Moscow.__table__.insert(), rows)
+
+
+async def build_bot(bot_api, args):
+    from aiogram import Dispatcher
+
+    from src.app.handlers import router
+    from src.db.catalog import UniversityCatalog
+    from src.db.profiles import ProfileStore
+    from src.db.schema import SchemaRegistry
+    from src.db.users import create_tables
+
+    await create_tables()
+    schema = SchemaRegistry()
+    catalog = UniversityCatalog()
+    await catalog.load()
+    profiles = ProfileStore(schema, write_behind=args.write_behind)
+
+    dp = Dispatcher(catalog=catalog, schema=schema, profiles=profiles)
+    dp.include_router(router)
+    dp.startup.register(profiles.start)
+    dp.shutdown.register(profiles.close)
+    return dp, bot_api.create_bot()
+
+
+def use_temp_databases():
+    # Модули src создают движки при импорте, поэтому URL задаются раньше
+    directory = tempfile.mkdtemp()
+    os.environ["USER_SQL_URL"] = (
+        f"sqlite+aiosqlite:///{os.path.join(directory, 'users.sqlite3')}"
+    )
+    os.environ["UNIV_SQL_URL"] = (
+        f"sqlite+aiosqlite:///{os.path.join(directory, 'univ.sqlite3')}"
+    )
+
+
+async def main(args):
+    use_temp_databases()
+    from aiogram import BaseMiddleware
+
+    from src.db.engines import dispose_engines
+    from src.utils.specializations import SPECIALIZATION_BITS
+
+    rng = random.Random(args.seed)
+    await seed_universities(args.universities, rng)
+
+    pending = {}
+
+    class CompletionMiddleware(BaseMiddleware):
+        # Апдейт считается обработанным, когда обработчик завершился
+        # вместе со всеми вызовами Bot API
+        async def __call__(self, handler, event, data):
+            try:
+                return await handler(event, data)
+            finally:
+                future = pending.pop(event.update_id, None)
+                if future is not None and not future.done():
+                    future.set_result(time.perf_counter())
+
+    factory = UpdateFactory()
+    latencies = {}
+    failures = 0
+    specializations = list(SPECIALIZATION_BITS)
+
+    async with FakeBotAPIServer() as bot_api:
+        dp, bot = await build_bot(bot_api, args)
+        dp.update.outer_middleware(CompletionMiddleware())
+        if args.record:
+            # Синтетический поток для benchmarks.replay_updates
+            from src.app.recording import UpdateRecorder
+
+            recorder = UpdateRecorder(args.record)
+            dp.update.outer_middleware(recorder)
+            dp.shutdown.register(recorder.close)
+        polling = asyncio.create_task(
+            dp.start_polling(bot, polling_timeout=1, handle_signals=False)
+        )
+
+        async def virtual_user(user_id):
+            nonlocal failures
+            # Пользователи приходят не одновременно
+            await asyncio.sleep(rng.uniform(0, args.ramp_up))
+            flow = user_flow(
+                args.bulk_scores,
+                rng.choice(specializations),
+                rng.randint(1, args.universities),
+            )
+            for step, kind, payload in flow:
+                update_id, update = factory.build(user_id, kind, payload)
+                future = asyncio.get_running_loop().create_future()
+                pending[update_id] = future
+                started = time.perf_counter()
+                bot_api.push_update(update)
+                try:
+                    finished = await asyncio.wait_for(future, args.timeout)
+                except asyncio.TimeoutError:
+                    pending.pop(update_id, None)
+                    failures += 1
+                    continue
+                latencies.setdefault(step, []).append(finished - started)
+                if args.think_time:
+                    await asyncio.sleep(rng.uniform(0, args.think_time))
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(virtual_user(user_id) for user_id in range(1, args.users + 1))
+        )
+        elapsed = time.perf_counter() - started
+
+        await dp.stop_polling()
+        await polling
+        bot_api_calls = len(bot_api.requests)
+
+    await dispose_engines()
+
+    all_latencies = [
+        value for values in latencies.values() for value in values
+    ]
+    result = {
+        "users": args.users,
+        "universities": args.universities,
+        "bulk_scores": args.bulk_scores,
+        "write_behind": args.write_behind,
+        "updates": len(all_latencies),
+        "failures": failures,
+        "seconds": elapsed,
+        "updates_per_second": len(all_latencies) / elapsed,
+        "bot_api_calls": bot_api_calls,
+        "latency": summarize(all_latencies),
+        "steps": {
+            step: summarize(values) for step, values in latencies.items()
+        },
+    }
+
+    print(
+        f"{'step':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for step, stats in [("all", result["latency"]), *result["steps"].items()]:
+        print(
+            f"{step:<22}{stats['count']:>8}{stats['p50_ms']:>10.2f}"
+            f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        )
+    print(
+        f"{result['updates']} updates in {elapsed:.2f} s, "
+        f"{result['updates_per_second']:.0f} updates/s, "
+        f"{failures} timed out"
+    )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="End-to-end load test against a fake Bot API server"
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--universities", type=int, default=200)
+    parser.add_argument("--ramp-up", type=float, default=1.0)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--bulk-scores", action="store_true")
+    parser.add_argument("--write-behind", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write machine-readable results here")
+    parser.add_argument("--record", help="Record incoming updates here")
+    asyncio.run(main(parser.parse_args()))
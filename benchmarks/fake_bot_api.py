@@ -0,0 +1,119 @@
+import asyncio
+import itertools
+import json
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+
+class FakeBotAPIServer:
+    # Локальная замена Bot API: отдает апдейты через getUpdates и
+    # отвечает успехом на любой исходящий метод
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.pending_updates = asyncio.Queue()
+        self.requests = []
+        self._message_ids = itertools.count(1)
+        self._runner = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def create_bot(self, token="42:FAKE"):
+        session = AiohttpSession(
+            api=TelegramAPIServer.from_base(self.base_url)
+        )
+        return Bot(token=token, session=session)
+
+    def push_update(self, update):
+        self.pending_updates.put_nowait(update)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _read_params(self, request):
+        if request.content_type == "application/json":
+            return await request.json()
+        form = await request.post()
+        return {key: value for key, value in form.items()}
+
+    async def _handle(self, request):
+        method = request.match_info["method"]
+        params = await self._read_params(request)
+        self.requests.append((time.perf_counter(), method, params))
+
+        if method == "getUpdates":
+            result = await self._get_updates(params)
+        elif method == "getMe":
+            result = {
+                "id": 42,
+                "is_bot": True,
+                "first_name": "Fake",
+                "username": "fake_bot",
+            }
+        elif method in ("sendMessage", "editMessageText"):
+            result = self._message(params)
+        else:
+            result = True
+
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, params):
+        timeout = float(params.get("timeout") or 0)
+        updates = []
+        try:
+            updates.append(
+                await asyncio.wait_for(
+                    self.pending_updates.get(), timeout=max(timeout, 0.01)
+                )
+            )
+        except asyncio.TimeoutError:
+            return []
+
+        limit = int(params.get("limit") or 100)
+        while len(updates) < limit and not self.pending_updates.empty():
+            updates.append(self.pending_updates.get_nowait())
+        return updates
+
+    def _message(self, params):
+        chat_id = int(params.get("chat_id") or 0)
+        reply_markup = params.get("reply_markup")
+        if isinstance(reply_markup, str):
+            reply_markup = json.loads(reply_markup)
+
+        message = {
+            "message_id": int(
+                params.get("message_id") or next(self._message_ids)
+            ),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": 42, "is_bot": True, "first_name": "Fake"},
+            "text": params.get("text", ""),
+        }
+        if isinstance(reply_markup, dict) and (
+            "inline_keyboard" in reply_markup
+        ):
+            message["reply_markup"] = reply_markup
+        return message
@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+
+class FakeRedisServer:
+    # Локальная замена Redis: понимает только команды, нужные FSM-хранилищу
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.hashes = {}
+        self.expires = {}
+        self._server = None
+        self._clients = set()
+
+    @property
+    def url(self):
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        for writer in list(self._clients):
+            writer.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2].decode())
+        return args
+
+    async def _handle_client(self, reader, writer):
+        self._clients.add(writer)
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                writer.write(self._execute(args[0].upper(), args[1:]))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    def _get_hash(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.hashes.pop(key, None)
+            self.expires.pop(key, None)
+        return self.hashes.get(key)
+
+    def _execute(self, command, args):
+        if command == "HGET":
+            value = (self._get_hash(args[0]) or {}).get(args[1])
+            return _bulk(value)
+        if command == "HMGET":
+            values = self._get_hash(args[0]) or {}
+            return _array([values.get(field) for field in args[1:]])
+        if command == "HSET":
+            values = self.hashes.setdefault(args[0], {})
+            pairs = list(zip(args[1::2], args[2::2]))
+            added = sum(field not in values for field, _ in pairs)
+            values.update(pairs)
+            return _integer(added)
+        if command == "HDEL":
+            values = self._get_hash(args[0]) or {}
+            removed = sum(
+                values.pop(field, None) is not None for field in args[1:]
+            )
+            if not values:
+                self.hashes.pop(args[0], None)
+            return _integer(removed)
+        if command == "EXPIRE":
+            if self._get_hash(args[0]) is None:
+                return _integer(0)
+            self.expires[args[0]] = time.monotonic() + int(args[1])
+            return _integer(1)
+        if command == "DEL":
+            return _integer(
+                sum(self.hashes.pop(key, None) is not None for key in args)
+            )
+        if command == "FLUSHDB":
+            self.hashes.clear()
+            self.expires.clear()
+            return b"+OK\r\n"
+        if command == "HELLO":
+            # Поддерживается только RESP2, клиенту нужен protocol=2
+            return b"-ERR unknown command 'HELLO'\r\n"
+        if command == "PING":
+            return b"+PONG\r\n"
+        # CLIENT SETINFO, SELECT и прочие служебные команды
+        return b"+OK\r\n"
+
+
+def _bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    value = value.encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _array(values):
+    return b"*%d\r\n" % len(values) + b"".join(map(_bulk, values))
+
+
+def _integer(value):
+    return b":%d\r\n" % value
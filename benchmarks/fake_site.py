@@ -0,0 +1,199 @@
+import asyncio
+import os
+import time
+
+from aiohttp import web
+
+from src.utils.normalize import parse_fee_info
+from src.utils.scraper import (
+    CATEGORIES_URL,
+    CATEGORY_COUNT,
+    LISTING_PAGES,
+    LISTING_URL,
+    page_filename,
+    SITE_URL,
+    UNIVERSITIES_PER_PAGE,
+)
+from src.utils.specializations import SPECIALIZATION_BITS
+
+
+class FakeSiteServer:
+    # Локальная замена сайта для парсера: отдает сохраненные страницы по
+    # пути и query, с задержкой и случайными ошибками 503
+
+    def __init__(
+        self, pages, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0
+    ):
+        self.pages = pages
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = []
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._runner = None
+        self._failures = 0.0
+
+    @classmethod
+    def from_directory(cls, directory, **kwargs):
+        # Каталог страниц, сохраненных парсером с SCRAPER_SAVE_DIR
+        pages = {}
+        for filename in os.listdir(directory):
+            with open(
+                os.path.join(directory, filename), encoding="utf-8"
+            ) as file:
+                pages[filename] = file.read()
+        return cls(pages, **kwargs)
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _handle(self, request):
+        self.requests.append(time.perf_counter())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            # Ошибки идут равномерно, а не случайно, чтобы прогоны
+            # были сравнимы
+            self._failures += self.error_rate
+            if self._failures >= 1:
+                self._failures -= 1
+                self.errors += 1
+                return web.Response(status=503)
+
+            html = self.pages.get(page_filename(str(request.rel_url)))
+            if html is None:
+                return web.Response(status=404)
+            return web.Response(text=html, content_type="text/html")
+        finally:
+            self.in_flight -= 1
+
+    def max_rate(self, window=1.0):
+        # Наибольшее число запросов за window секунд
+        best = 0
+        start = 0
+        for end, moment in enumerate(self.requests):
+            while moment - self.requests[start] >= window:
+                start += 1
+            best = max(best, end - start + 1)
+        return best
+
+
+def _fee_block(rng):
+    lines = [f"{rng.randint(100, 500)} 000 ₽"]
+    if rng.random() < 0.7:
+        lines += ["Бюджет", f"{rng.randint(1, 300)} мест"]
+        lines.append(rng.choice([f"от {rng.randint(150, 300)}", "от ?"]))
+    lines += ["Платное", f"{rng.randint(1, 500)} мест"]
+    lines.append(rng.choice([f"от {rng.randint(100, 250)}", "от -"]))
+    return "".join(f"<div>{line}</div>" for line in lines)
+
+
+def _page(body):
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        "<script>var a = '<div class=\"itemVuzTitle\">';</script>"
+        f"</head><body>{body}</body></html>"
+    )
+
+
+def _university_item(university_id, name, fee=None, link=True):
+    title = f"<div class='itemVuzTitle'>\n  {name}\n</div>"
+    if link:
+        title = f"<a href='/vuz/{university_id}'>{title}</a>"
+    item = f"<div class='itemVuz'>{title}"
+    if fee is not None:
+        item += f"<div class='col-md-2 optionVuzNew'>{fee}</div>"
+    return item + "</div>"
+
+
+def synthetic_site(
+    rng,
+    listing_pages=LISTING_PAGES,
+    category_count=CATEGORY_COUNT,
+):
+    # Страницы в разметке vuzopedia и записи, которые из них должен
+    # получить парсер
+    pages = {}
+    universities = []
+    names = []
+    university_id = 0
+    for page in range(1, listing_pages + 1):
+        url = LISTING_URL.format(page=page)
+        items = []
+        for _ in range(UNIVERSITIES_PER_PAGE):
+            university_id += 1
+            name = f"Университет &laquo;{university_id}&raquo;"
+            names.append(f"Университет «{university_id}»")
+            fee = _fee_block(rng)
+            # У части вузов в списке нет ссылки на страницу вуза
+            link = rng.random() < 0.95
+            items.append(_university_item(university_id, name, fee, link))
+            universities.append(
+                {
+                    "name": names[-1],
+                    "url": (
+                        f"{SITE_URL}/vuz/{university_id}"
+                        if link
+                        else "нет данных"
+                    ),
+                    **parse_fee_info(
+                        fee.replace("<div>", "").replace("</div>", "\n")
+                    ),
+                }
+            )
+        pages[page_filename(url)] = _page("".join(items))
+
+    categories = {}
+    items = []
+    columns = list(SPECIALIZATION_BITS)[:category_count]
+    for column in columns:
+        category = column.removeprefix("spec_")
+        members = rng.sample(names, rng.randint(1, len(names) // 4))
+        categories[category] = members
+        category_url = f"{SITE_URL}/city/moskva/vuzi?s={category}"
+        items.append(
+            f"<a href='/city/moskva/vuzi?s={category}'>"
+            f"<div class='teloVuzItemMain'>"
+            f"<div class='vuzItemTitle'>{category}</div>"
+            f"<span class='cyrCountVUz'>{len(members)} вузов</span>"
+            "</div></a>"
+        )
+        for page in range(0, len(members), UNIVERSITIES_PER_PAGE):
+            chunk = members[page : page + UNIVERSITIES_PER_PAGE]
+            pages[
+                page_filename(
+                    f"{category_url}&page={page // UNIVERSITIES_PER_PAGE + 1}"
+                )
+            ] = _page(
+                "".join(
+                    _university_item(names.index(name) + 1, name)
+                    for name in chunk
+                )
+            )
+    pages[page_filename(CATEGORIES_URL)] = _page("".join(items))
+    return pages, universities, categories
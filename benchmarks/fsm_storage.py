@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from benchmarks.fake_redis import FakeRedisServer
+from src.db.fsm_storage import RedisHashStorage, SQLiteStorage
+
+
+# Запуск: python -m benchmarks.fsm_storage [--redis-url redis://...]
+
+
+async def simulate_update(storage, user_id, step):
+    key = StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+    started = time.perf_counter()
+
+    # Так FSM-контекст используется в типичном обработчике: состояние читает
+    # middleware, данные и новое состояние пишет обработчик
+    await storage.get_state(key)
+    data = await storage.get_data(key)
+    data["step"] = step
+    await storage.set_data(key, data)
+    await storage.set_state(key, "Form:subject")
+
+    return time.perf_counter() - started
+
+
+async def run_backend(storage, users, updates_per_user, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def user_session(user_id):
+        for step in range(updates_per_user):
+            async with semaphore:
+                latencies.append(
+                    await asyncio.create_task(
+                        simulate_update(storage, user_id, step)
+                    )
+                )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_session(i) for i in range(1, users + 1)))
+    elapsed = time.perf_counter() - started
+    await storage.close()
+
+    latencies.sort()
+    return {
+        "updates": len(latencies),
+        "updates_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        async with FakeRedisServer() as fake_redis:
+            backends = {
+                "memory": MemoryStorage(),
+                "sqlite": SQLiteStorage(os.path.join(tmp_dir, "fsm.sqlite3")),
+                "redis (stand-in)": RedisHashStorage.from_url(
+                    fake_redis.url, protocol=2
+                ),
+            }
+            if args.redis_url:
+                backends["redis"] = RedisHashStorage.from_url(args.redis_url)
+
+            for name, storage in backends.items():
+                results[name] = await run_backend(
+                    storage, args.users, args.updates, args.concurrency
+                )
+
+    print(
+        f"{'backend':<18}{'updates/s':>12}{'p50 ms':>10}"
+        f"{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<18}{result['updates_per_second']:>12.0f}"
+            f"{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+            f"{result['p99_ms']:>10.3f}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Per-update FSM state latency for each storage backend"
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redis-url", default=None)
+    asyncio.run(main(parser.parse_args()))
+    sys.exit(0)
@@ -0,0 +1,254 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import timeit
+
+
+# Запуск: python -m benchmarks.hot_paths [--sizes 200 10000 100000]
+#         [--save-baseline] [--threshold 1.0] [--samples 5]
+# Сравнивает время горячих путей с сохраненным baseline и завершается с
+# кодом 1, если какой-то путь стал медленнее больше чем на --threshold.
+# В baseline хранится время относительно калибровочной нагрузки, измеренной
+# рядом с каждым путем, поэтому общая загрузка машины в сравнение не попадает.
+# И baseline, и текущее время — медиана --samples замеров. Поиск по большим
+# каталогам упирается в память и между запусками плавает на десятки
+# процентов, поэтому порог по умолчанию 100%, а для пути с разбросом
+# замеров больше половины порога он равен двойному разбросу
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(__file__), "baselines", "hot_paths.json"
+)
+FEE_INFO = "\n".join(
+    [
+        "245 000 ₽",
+        "Бюджет",
+        "120 мест",
+        "от 265",
+        "Платное",
+        "340 мест",
+        "от 180",
+    ]
+)
+
+
+CALIBRATION_DATA = [random.Random(0).random() for _ in range(1000)]
+
+
+def calibrate():
+    return sorted(f"{value:.3f}" for value in CALIBRATION_DATA)
+
+
+def synthetic_catalog(size, rng, bits):
+    from src.db.catalog import University
+
+    for university_id in range(1, size + 1):
+        bud_score = rng.randint(120, 300)
+        pay_score = rng.randint(100, bud_score)
+        mask = 0
+        for bit in rng.sample(bits, 3):
+            mask |= bit
+        university = University(
+            ID=university_id,
+            name=f"Университет {university_id}",
+            coast=f"{rng.randint(100, 500)} 000 ₽",
+            bud_places=f"{rng.randint(0, 300)} мест",
+            pay_places=f"{rng.randint(0, 300)} мест",
+            bud_score=f"от {bud_score}",
+            pay_score=f"от {pay_score}",
+            url=f"https://example.com/{university_id}",
+            specialization_mask=mask,
+        )
+        yield university, float(bud_score), float(pay_score)
+
+
+def cycle(values):
+    # Каждый вызов берет следующие входные данные, чтобы не мерить кэш
+    return itertools.cycle(values).__next__
+
+
+def catalog_cases(size, rng):
+    from src.app.handlers import generate_university_buttons
+    from src.app.messages import format_university, format_university_list
+    from src.db.catalog import (
+        pack_ids,
+        PAGE_SIZE,
+        UniversityCatalog,
+        unpack_ids,
+    )
+    from src.utils.specializations import SPECIALIZATION_BITS
+
+    bits = list(SPECIALIZATION_BITS.values())
+    entries = list(synthetic_catalog(size, rng, bits))
+    catalog = UniversityCatalog()
+    catalog.build(entries)
+
+    queries = cycle(
+        [(rng.uniform(150, 300), rng.choice([0, *bits])) for _ in range(64)]
+    )
+    results = [
+        ids
+        for ids in (catalog.search_budget(*queries()) for _ in range(64))
+        if ids
+    ]
+    pages = cycle(
+        [
+            (ids, rng.randrange((len(ids) - 1) // PAGE_SIZE + 1))
+            for ids in results
+        ]
+    )
+    packed = cycle([pack_ids(ids) for ids in results])
+    universities = cycle(
+        [catalog.get(rng.randint(1, size)) for _ in range(64)]
+    )
+
+    def university_list():
+        ids, page = pages()
+        return format_university_list(
+            "Выберите нужный вам ВУЗ:", catalog.page(ids, page)
+        )
+
+    return {
+        "catalog_build": lambda: UniversityCatalog().build(entries),
+        "search_budget": lambda: catalog.search_budget(*queries()),
+        "search_paid": lambda: catalog.search_paid(*queries()),
+        "search_state": lambda: unpack_ids(packed()),
+        "university_buttons": lambda: generate_university_buttons(*pages()),
+        "university_list": university_list,
+        "university_card": lambda: format_university(universities()),
+    }
+
+
+def static_cases(rng):
+    from src.app.messages import format_profile
+    from src.db.profiles import compute_mean, Profile
+    from src.utils.normalize import normalize_university, parse_fee_info
+    from src.utils.scores import parse_scores, SUBJECT_NAMES
+    from src.utils.specializations import SPECIALIZATION_BITS
+
+    scores = {
+        f"sub_{subject}": rng.randint(40, 100)
+        for subject in rng.sample(list(SUBJECT_NAMES), 4)
+    }
+    profile = Profile(
+        city="Москва",
+        scores=scores,
+        mean_value=compute_mean(scores),
+        specialization_mask=sum(
+            rng.sample(list(SPECIALIZATION_BITS.values()), 3)
+        ),
+    )
+    info = parse_fee_info(FEE_INFO)
+
+    return {
+        "profile_view": lambda: format_profile(profile),
+        "bulk_scores": lambda: parse_scores("рус 85, мат_проф 90, инф 95"),
+        "fee_info": lambda: parse_fee_info(FEE_INFO),
+        "normalize": lambda: normalize_university(
+            coast=info["coast"],
+            bud_places=info["bud_places"],
+            pay_places=info["pay_places"],
+            bud_score=info["bud_score"],
+            pay_score=info["pay_score"],
+        ),
+    }
+
+
+class Timer:
+    def __init__(self, func):
+        # Число вызовов на серию (~0.2 с) подбирается один раз
+        self.timer = timeit.Timer(func)
+        self.number, _ = self.timer.autorange()
+
+    def measure(self, repeat):
+        # Лучшее время на вызов из repeat серий
+        return min(self.timer.repeat(repeat, self.number)) / self.number
+
+
+def measure_relative(func, calibration, samples, repeat):
+    # Медиана отношений ко времени калибровки, измеренной рядом с путем,
+    # и разброс замеров относительно медианы
+    timer = Timer(func)
+    seconds = []
+    relatives = []
+    for _ in range(samples):
+        seconds.append(timer.measure(repeat))
+        relatives.append(seconds[-1] / calibration.measure(repeat))
+    relative = statistics.median(relatives)
+    spread = (max(relatives) - min(relatives)) / relative
+    return statistics.median(seconds), relative, spread
+
+
+def main(args):
+    # Модули src создают движки при импорте; в БД бенчмарк не ходит
+    os.environ.setdefault("USER_SQL_URL", "sqlite+aiosqlite://")
+    os.environ.setdefault("UNIV_SQL_URL", "sqlite+aiosqlite://")
+
+    # Данные каждого размера не зависят от набора --sizes
+    cases = [("-", static_cases(random.Random(args.seed)))]
+    for size in args.sizes:
+        cases.append(
+            (str(size), catalog_cases(size, random.Random(args.seed + size)))
+        )
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    results = {}
+    regressions = []
+    print(
+        f"{'path':<22}{'size':>8}{'us/op':>12}{'relative':>10}"
+        f"{'baseline':>10}{'change':>10}"
+    )
+    calibration = Timer(calibrate)
+    for size, paths in cases:
+        for name, func in paths.items():
+            key = f"{name}/{size}"
+            seconds, relative, spread = measure_relative(
+                func, calibration, args.samples, args.repeat
+            )
+            results[key] = relative
+            line = (
+                f"{name:<22}{size:>8}{seconds * 1e6:>12.2f}{relative:>10.4f}"
+            )
+            if key in baseline and not args.save_baseline:
+                change = relative / baseline[key] - 1
+                line += f"{baseline[key]:>10.4f}{change:>+9.1%}"
+                if change > max(args.threshold, 2 * spread):
+                    regressions.append(key)
+                    line += "  REGRESSION"
+            print(line)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({**baseline, **results}, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(
+            f"{len(regressions)} paths regressed more than "
+            f"{args.threshold:.0%}: {', '.join(regressions)}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks for search, keyboards and messages"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[200, 10000, 100000]
+    )
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--threshold", type=float, default=1.0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+# Запуск: python -m benchmarks.profile_writes [--sizes 1000 10000 100000]
+# Без --url используется временная SQLite-база
+
+LEGACY_TABLE = "legacy_users"
+
+
+async def fill(session, table, start, stop):
+    await session.execute(
+        table.insert(),
+        [{"tg_id": tg_id, "city": "Москва"} for tg_id in range(start, stop)],
+    )
+
+
+async def legacy_set_city(session, table, tg_id, city):
+    # Прежний вариант: select по неиндексированному tg_id и insert/update
+    async with session.begin():
+        row = (
+            await session.execute(table.select().where(table.c.tg_id == tg_id))
+        ).first()
+        if row:
+            await session.execute(
+                table.update().where(table.c.tg_id == tg_id).values(city=city)
+            )
+        else:
+            await session.execute(
+                table.insert().values(tg_id=tg_id, city=city)
+            )
+
+
+async def measure(write, tg_ids):
+    timings = []
+    for tg_id in tg_ids:
+        started = time.perf_counter()
+        await write(tg_id)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return (
+        statistics.mean(timings),
+        timings[int(len(timings) * 0.95) - 1],
+    )
+
+
+async def main(args):
+    # Модули src создают движки при импорте, поэтому URL задается раньше
+    os.environ["USER_SQL_URL"] = args.url
+    os.environ.setdefault("UNIV_SQL_URL", args.url)
+
+    from sqlalchemy import (
+        BigInteger,
+        Column,
+        Integer,
+        MetaData,
+        String,
+        Table,
+    )
+
+    from src.db.profiles import _SET_CITY
+    from src.db.users import Base, engine_users, SessionLocalUsers, User
+
+    engine_users.echo = False
+    legacy = Table(
+        LEGACY_TABLE,
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("tg_id", BigInteger),
+        Column("city", String(25)),
+    )
+    async with engine_users.begin() as connection:
+        await connection.run_sync(
+            Base.metadata.drop_all, tables=[User.__table__]
+        )
+        await connection.run_sync(legacy.metadata.drop_all)
+        await connection.run_sync(
+            Base.metadata.create_all, tables=[User.__table__]
+        )
+        await connection.run_sync(legacy.metadata.create_all)
+
+    rng = random.Random(0)
+    size = 0
+    next_new = max(args.sizes) + 1
+
+    print(
+        f"{'rows':>10}{'legacy ms':>12}{'legacy p95':>12}"
+        f"{'upsert ms':>12}{'upsert p95':>12}"
+    )
+    async with SessionLocalUsers() as session:
+        for target in sorted(args.sizes):
+            async with session.begin():
+                await fill(session, legacy, size + 1, target + 1)
+                await fill(session, User.__table__, size + 1, target + 1)
+            size = target
+
+            # Половина записей обновляет существующих, половина добавляет
+            tg_ids = []
+            for i in range(args.writes):
+                if i % 2:
+                    tg_ids.append(rng.randint(1, size))
+                else:
+                    tg_ids.append(next_new)
+                    next_new += 1
+
+            async def upsert_city(tg_id):
+                async with session.begin():
+                    await session.execute(
+                        _SET_CITY, {"tg_id": tg_id, "city": "Казань"}
+                    )
+
+            legacy_mean, legacy_p95 = await measure(
+                lambda tg_id: legacy_set_city(
+                    session, legacy, tg_id, "Казань"
+                ),
+                tg_ids,
+            )
+            upsert_mean, upsert_p95 = await measure(upsert_city, tg_ids)
+            print(
+                f"{size:>10}{legacy_mean:>12.3f}{legacy_p95:>12.3f}"
+                f"{upsert_mean:>12.3f}{upsert_p95:>12.3f}"
+            )
+
+    await engine_users.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Profile write latency as the user table grows"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--url")
+    args = parser.parse_args()
+    if args.url is None:
+        path = os.path.join(tempfile.mkdtemp(), "profile_writes.sqlite3")
+        args.url = f"sqlite+aiosqlite:///{path}"
+    asyncio.run(main(args))
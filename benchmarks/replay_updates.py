@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+
+from benchmarks.e2e_load import (
+    build_bot,
+    seed_universities,
+    summarize,
+    use_temp_databases,
+)
+from benchmarks.fake_bot_api import FakeBotAPIServer
+
+
+# Запуск: python -m benchmarks.replay_updates updates.jsonl.gz [--speed 1]
+#         [--json new.json] [--compare old.json]
+# Апдейты, записанные UpdateRecorder (UPDATE_RECORD_FILE), подаются в
+# Dispatcher.feed_update текущей сборки с исходными интервалами: --speed 10
+# проигрывает поток в 10 раз быстрее, --speed 0 — без пауз. Бот работает
+# против локального Bot API и чистых SQLite-баз с синтетическими вузами
+
+COMPARED = (
+    ("updates/s", lambda result: result["updates_per_second"]),
+    ("p50 ms", lambda result: result["latency"]["p50_ms"]),
+    ("p95 ms", lambda result: result["latency"]["p95_ms"]),
+    ("p99 ms", lambda result: result["latency"]["p99_ms"]),
+)
+
+
+async def replay(args, records):
+    from aiogram import BaseMiddleware
+    from aiogram.types import Update
+
+    handlers = {}
+
+    class HandlerNameMiddleware(BaseMiddleware):
+        async def __call__(self, handler, event, data):
+            handlers[data["event_update"].update_id] = data[
+                "handler"
+            ].callback.__name__
+            return await handler(event, data)
+
+    latencies = []
+    by_handler = {}
+    errors = {}
+
+    async with FakeBotAPIServer() as bot_api:
+        dp, bot = await build_bot(bot_api, args)
+        handler_middleware = HandlerNameMiddleware()
+        dp.message.middleware(handler_middleware)
+        dp.callback_query.middleware(handler_middleware)
+        await dp.emit_startup(bot=bot)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        previous = {}
+
+        async def feed(update, before):
+            # Апдейты одного пользователя обрабатываются по очереди, как при
+            # живом диалоге, иначе при ускорении ломаются переходы FSM
+            if before is not None:
+                await before
+            # Задержка считается от момента, когда апдейт мог быть принят,
+            # поэтому очередь перед семафором тоже попадает в результат
+            started = time.perf_counter()
+            async with semaphore:
+                try:
+                    await dp.feed_update(bot, update)
+                except Exception as e:
+                    name = type(e).__name__
+                    errors[name] = errors.get(name, 0) + 1
+            latency = time.perf_counter() - started
+            latencies.append(latency)
+            handler = handlers.pop(update.update_id, "unhandled")
+            by_handler.setdefault(handler, []).append(latency)
+
+        tasks = []
+        started = time.perf_counter()
+        for record in records:
+            if args.speed:
+                delay = record["t"] / args.speed - (
+                    time.perf_counter() - started
+                )
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            update = Update.model_validate(
+                record["update"], context={"bot": bot}
+            )
+            user = getattr(update.event, "from_user", None)
+            key = user.id if user is not None else None
+            task = asyncio.create_task(feed(update, previous.get(key)))
+            if key is not None:
+                previous[key] = task
+            tasks.append(task)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+
+    return {
+        "recording": args.recording,
+        "speed": args.speed,
+        "updates": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "updates_per_second": len(latencies) / elapsed,
+        "latency": summarize(latencies),
+        "handlers": {
+            handler: summarize(values)
+            for handler, values in sorted(by_handler.items())
+        },
+    }
+
+
+def print_result(result):
+    print(
+        f"{'handler':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}"
+    )
+    for handler, stats in [
+        ("all", result["latency"]),
+        *result["handlers"].items(),
+    ]:
+        print(
+            f"{handler:<28}{stats['count']:>8}{stats['p50_ms']:>10.2f}"
+            f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        )
+    print(
+        f"{result['updates']} updates in {result['seconds']:.2f} s, "
+        f"{result['updates_per_second']:.0f} updates/s, "
+        f"errors: {result['errors'] or 'none'}"
+    )
+
+
+def print_comparison(baseline, result):
+    rows = [
+        (name, metric(baseline), metric(result)) for name, metric in COMPARED
+    ]
+    for handler, stats in result["handlers"].items():
+        old = baseline["handlers"].get(handler)
+        if old is not None:
+            rows.append((f"{handler} p95 ms", old["p95_ms"], stats["p95_ms"]))
+
+    print()
+    print(f"{'metric':<36}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, old, new in rows:
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{name:<36}{old:>12.2f}{new:>12.2f}{change:>+9.1f}%")
+
+
+async def main(args):
+    use_temp_databases()
+
+    from src.app.recording import read_recording
+    from src.db.engines import dispose_engines
+
+    records = read_recording(args.recording)
+    if args.limit:
+        records = records[: args.limit]
+    if not records:
+        raise SystemExit(f"No updates in {args.recording}")
+
+    await seed_universities(args.universities, random.Random(args.seed))
+    try:
+        result = await replay(args, records)
+    finally:
+        await dispose_engines()
+
+    print_result(result)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            print_comparison(json.load(file), result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    parser = argparse.ArgumentParser(
+        description="Replay recorded updates and compare builds"
+    )
+    parser.add_argument("recording")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--universities", type=int, default=200)
+    parser.add_argument("--write-behind", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write machine-readable results here")
+    parser.add_argument("--compare", help="Baseline result from --json")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from benchmarks.fake_site import FakeSiteServer, synthetic_site
+from src.utils.scraper import (
+    Fetcher,
+    LISTING_PAGES,
+    scrape,
+    UNIVERSITIES_PER_PAGE,
+)
+
+
+# Запуск: python -m benchmarks.scraper [--pages saved_pages/]
+#         [--latency 0.05] [--error-rate 0.05] [--concurrency 8] [--rate 20]
+# Парсер обходит локальный сервер с синтетическими страницами (или
+# страницами, сохраненными с SCRAPER_SAVE_DIR) и сверяет записи
+
+
+async def main(args):
+    expected = None
+    if args.pages:
+        server = FakeSiteServer.from_directory(
+            args.pages, latency=args.latency, error_rate=args.error_rate
+        )
+    else:
+        pages, universities, categories = synthetic_site(
+            random.Random(args.seed)
+        )
+        expected = (universities, categories)
+        server = FakeSiteServer(
+            pages, latency=args.latency, error_rate=args.error_rate
+        )
+
+    async with server:
+        fetcher = Fetcher(
+            base_url=server.base_url,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            retries=args.retries,
+            backoff=args.backoff,
+        )
+        started = time.perf_counter()
+        async with fetcher:
+            result = await scrape(fetcher)
+        elapsed = time.perf_counter() - started
+
+    universities, categories = result
+    print(
+        f"{len(universities)} universities, {len(categories)} categories, "
+        f"{sum(map(len, categories.values()))} category entries"
+    )
+    print(
+        f"{elapsed:.2f} s, {fetcher.requests} requests, "
+        f"{fetcher.retried} retries, {server.errors} injected errors"
+    )
+    print(
+        f"max {server.max_in_flight} concurrent requests, "
+        f"max {server.max_rate()} requests per second"
+    )
+    # Последовательный обход Selenium: страница категорий перед каждой
+    # категорией и пауза 2 с на каждой странице категории
+    category_pages = sum(
+        -(-len(names) // UNIVERSITIES_PER_PAGE)
+        for names in categories.values()
+    )
+    sequential_pages = LISTING_PAGES + len(categories) + category_pages
+    print(
+        "sequential crawl estimate: "
+        f"{sequential_pages * args.latency + category_pages * 2:.0f} s"
+    )
+
+    if expected is not None:
+        if result != expected:
+            print("Scraped records differ from the synthetic site.")
+            sys.exit(1)
+        print("Scraped records match the synthetic site.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Scraper run against a local fixture site"
+    )
+    parser.add_argument("--pages", help="directory with saved pages")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import itertools
+import time
+
+from aiogram import Dispatcher, Router
+from aiohttp import ClientSession
+
+from benchmarks.fake_bot_api import FakeBotAPIServer
+from src.app.webhook import SECRET_HEADER, WebhookServer
+
+
+# Запуск: python -m benchmarks.webhook_load [--updates 5000]
+
+SECRET_TOKEN = "load-test-secret"
+
+
+def synthetic_updates(count, users):
+    update_ids = itertools.count(1)
+    for i in range(count):
+        user_id = i % users + 1
+        yield {
+            "update_id": next(update_ids),
+            "message": {
+                "message_id": i + 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "u"},
+                "text": "Начать поиск",
+            },
+        }
+
+
+def create_dispatcher(expected, handler_delay):
+    processed = asyncio.Event()
+    counter = itertools.count(1)
+    router = Router()
+
+    @router.message()
+    async def handle(message):
+        # Имитация ожидания БД внутри обработчика
+        await asyncio.sleep(handler_delay)
+        if next(counter) == expected:
+            processed.set()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp, processed
+
+
+async def bench_webhook(args):
+    dp, processed = create_dispatcher(args.updates, args.handler_delay)
+    async with FakeBotAPIServer() as bot_api:
+        bot = bot_api.create_bot()
+        server = WebhookServer(
+            dp,
+            bot,
+            secret_token=SECRET_TOKEN,
+            workers=args.workers,
+            queue_size=args.queue_size,
+        )
+        await server.start("127.0.0.1", args.port)
+        url = f"http://127.0.0.1:{args.port}{server.path}"
+
+        updates = list(synthetic_updates(args.updates, args.users))
+        semaphore = asyncio.Semaphore(args.concurrency)
+        rejected = 0
+
+        async with ClientSession() as http:
+
+            async def post(update):
+                nonlocal rejected
+                async with semaphore:
+                    while True:
+                        async with http.post(
+                            url,
+                            json=update,
+                            headers={SECRET_HEADER: SECRET_TOKEN},
+                        ) as response:
+                            if response.status == 200:
+                                return
+                        # Очередь заполнена: повторяем, как Telegram
+                        rejected += 1
+                        await asyncio.sleep(0.01)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(post(update) for update in updates))
+            await processed.wait()
+            elapsed = time.perf_counter() - started
+
+        await server.stop()
+        await bot.session.close()
+    return elapsed, rejected
+
+
+async def bench_polling(args):
+    dp, processed = create_dispatcher(args.updates, args.handler_delay)
+    async with FakeBotAPIServer() as bot_api:
+        bot = bot_api.create_bot()
+        for update in synthetic_updates(args.updates, args.users):
+            bot_api.push_update(update)
+
+        started = time.perf_counter()
+        polling = asyncio.create_task(
+            dp.start_polling(bot, polling_timeout=1, handle_signals=False)
+        )
+        await processed.wait()
+        elapsed = time.perf_counter() - started
+        await dp.stop_polling()
+        await polling
+    return elapsed
+
+
+async def main(args):
+    webhook_elapsed, rejected = await bench_webhook(args)
+    polling_elapsed = await bench_polling(args)
+
+    print(f"{'mode':<10}{'updates':>10}{'seconds':>10}{'updates/s':>12}")
+    for mode, elapsed in (
+        ("webhook", webhook_elapsed),
+        ("polling", polling_elapsed),
+    ):
+        print(
+            f"{mode:<10}{args.updates:>10}{elapsed:>10.2f}"
+            f"{args.updates / elapsed:>12.0f}"
+        )
+    print(f"webhook retries after 503: {rejected}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Webhook vs polling intake throughput"
+    )
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--handler-delay", type=float, default=0.005)
+    parser.add_argument("--port", type=int, default=8081)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import math
+import os
+
+from aiogram import F, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import FSInputFile, Message
+from dotenv import load_dotenv
+
+from src.app.cpu_profiler import CPUProfiler, MODES
+
+
+load_dotenv()
+ADMIN_IDS = frozenset(
+    int(admin_id)
+    for admin_id in os.getenv("ADMIN_IDS", "").split(",")
+    if admin_id.strip()
+)
+PROFILE_USAGE = (
+    "Использование: /profile [секунды] [N апдейтов, например 200u] "
+    f"[{'|'.join(MODES)}]\n/profile stop — остановить досрочно"
+)
+
+router = Router()
+# Команды видят только администраторы, для остальных роутер пропускает
+# сообщение дальше
+router.message.filter(F.from_user.id.in_(ADMIN_IDS))
+
+_report_tasks = set()
+
+
+def parse_profile_args(args, limit):
+    seconds = 30.0
+    updates = None
+    mode = "cprofile"
+    for arg in (args or "").split():
+        if arg in MODES:
+            mode = arg
+        elif arg.endswith("u") and arg[:-1].isdigit():
+            updates = int(arg[:-1])
+        else:
+            seconds = float(arg)
+            # float() принимает и "nan", и "inf", а до call_later должно
+            # дойти только конечное положительное время
+            if not (math.isfinite(seconds) and 0 < seconds <= limit):
+                raise ValueError(arg)
+    return mode, seconds, updates
+
+
+async def send_profile_report(message: Message, session):
+    try:
+        report, path = await session.done
+    except OSError as e:
+        await message.answer(f"Не удалось сохранить профиль: {e}")
+        return
+    await message.answer(report[:4000])
+    await message.answer_document(FSInputFile(path))
+
+
+@router.message(Command("profile"))
+async def profile_command(
+    message: Message, command: CommandObject, cpu_profiler: CPUProfiler
+):
+    if command.args == "stop":
+        if cpu_profiler.stop() is None:
+            await message.answer("Профилирование не запущено.")
+        return
+
+    try:
+        mode, seconds, updates = parse_profile_args(
+            command.args, cpu_profiler.max_seconds
+        )
+    except ValueError:
+        await message.answer(PROFILE_USAGE)
+        return
+
+    try:
+        session = cpu_profiler.start(mode, seconds, updates)
+    except RuntimeError:
+        await message.answer("Профилирование уже идет.")
+        return
+    except ValueError as e:
+        await message.answer(f"{e}\n{PROFILE_USAGE}")
+        return
+
+    await message.answer(
+        f"Профилирование ({mode}) запущено на {session.seconds:.0f} с"
+        + (f" или {updates} апдейтов." if updates else ".")
+    )
+    # Отчет приходит отдельным сообщением, обработчик не ждет окончания
+    task = asyncio.create_task(send_profile_report(message, session))
+    _report_tasks.add(task)
+    task.add_done_callback(_report_tasks.discard)
+    logging.info(f"CPU profiling requested by {message.from_user.id}.")
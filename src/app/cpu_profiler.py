@@ -0,0 +1,247 @@
+import asyncio
+from collections import Counter, defaultdict
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import signal
+import time
+import types
+import zipfile
+
+from aiogram import BaseMiddleware
+
+
+# Сэмплирование использует signal.setitimer, которого нет в Windows
+MODES = (
+    ("cprofile", "sample") if hasattr(signal, "setitimer") else ("cprofile",)
+)
+OUTSIDE_HANDLERS = "[outside handlers]"
+
+
+@types.coroutine
+def _run_segments(coroutine, on_enter, on_exit):
+    # Выполняет корутину обработчика по шагам и вызывает on_enter/on_exit
+    # вокруг каждого шага: пока обработчик ждет I/O, работают другие задачи,
+    # и их время в его профиль не попадает
+    value = None
+    error = None
+    while True:
+        on_enter()
+        try:
+            if error is not None:
+                yielded = coroutine.throw(error)
+            else:
+                yielded = coroutine.send(value)
+        except StopIteration as e:
+            return e.value
+        finally:
+            on_exit()
+        try:
+            value = yield yielded
+            error = None
+        except BaseException as e:
+            value = None
+            error = e
+
+
+class ProfilingSession:
+    def __init__(self, mode, seconds, updates, interval):
+        self.mode = mode
+        self.seconds = seconds
+        self.updates = updates
+        self.interval = interval
+        self.started = time.monotonic()
+        self.handled = Counter()
+        self.count = 0
+        self.profiles = defaultdict(cProfile.Profile)
+        self.samples = Counter()
+        self.current = None
+        self.done = asyncio.get_running_loop().create_future()
+        self._previous_handler = None
+
+    def start_sampler(self):
+        # SIGPROF приходит по процессорному времени и обрабатывается в
+        # главном потоке между инструкциями, поэтому сэмплы, в отличие от
+        # опроса из отдельного потока, не смещаются к точкам отпускания GIL
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def _sample(self, signum, frame):
+        # Цикл событий простаивает в select — такие сэмплы не нужны
+        if frame.f_code.co_name == "select" and self.current is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(
+                f"{frame.f_globals.get('__name__', '?')}:"
+                f"{frame.f_code.co_name}"
+            )
+            frame = frame.f_back
+        stack.append(self.current or OUTSIDE_HANDLERS)
+        self.samples[";".join(reversed(stack))] += 1
+
+    def stop_sampler(self):
+        if self._previous_handler is None:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler)
+        self._previous_handler = None
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        prefix = os.path.join(
+            directory, time.strftime("cpu-%Y%m%d-%H%M%S", time.localtime())
+        )
+        if self.mode == "sample":
+            # Формат collapsed stacks для flamegraph.pl и speedscope
+            path = f"{prefix}.collapsed"
+            with open(path, "w", encoding="utf-8") as file:
+                for stack, count in sorted(self.samples.items()):
+                    file.write(f"{stack} {count}\n")
+            return path
+
+        # По файлу pstats на обработчик (формат Profile.dump_stats),
+        # собранных в один архив
+        path = f"{prefix}.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for handler, profile in sorted(self.profiles.items()):
+                profile.create_stats()
+                archive.writestr(
+                    f"{handler}.pstats", marshal.dumps(profile.stats)
+                )
+        return path
+
+    def summary(self, limit=5):
+        elapsed = time.monotonic() - self.started
+        lines = [
+            f"CPU profile ({self.mode}), {elapsed:.1f} s, "
+            f"{self.count} updates"
+        ]
+        if self.mode == "sample":
+            per_handler = Counter()
+            for stack, count in self.samples.items():
+                per_handler[stack.split(";", 1)[0]] += count
+            total = sum(per_handler.values()) or 1
+            for handler, count in per_handler.most_common():
+                lines.append(
+                    f"{handler}: {count} samples ({count / total:.0%}), "
+                    f"{self.handled[handler]} updates"
+                )
+            return "\n".join(lines)
+
+        for handler, profile in sorted(
+            self.profiles.items(),
+            key=lambda item: pstats.Stats(item[1]).total_tt,
+            reverse=True,
+        ):
+            stats = pstats.Stats(profile, stream=io.StringIO())
+            lines.append(
+                f"{handler}: {stats.total_tt * 1000:.1f} ms CPU, "
+                f"{self.handled[handler]} updates"
+            )
+            top = sorted(
+                stats.stats.items(), key=lambda item: item[1][3], reverse=True
+            )
+            for (filename, line, function), row in top[:limit]:
+                lines.append(
+                    f"  {row[3] * 1000:.1f} ms "
+                    f"{os.path.basename(filename)}:{line}({function})"
+                )
+        return "\n".join(lines)
+
+
+class CPUProfiler(BaseMiddleware):
+    # Внутренний middleware обработчиков; пока профилирование выключено,
+    # стоимость — одна проверка атрибута на апдейт
+    def __init__(self, directory="profiles", max_seconds=600):
+        self.directory = directory
+        self.max_seconds = max_seconds
+        self.session = None
+        self._timer = None
+
+    @property
+    def active(self):
+        return self.session is not None
+
+    def start(self, mode="cprofile", seconds=30, updates=None, interval=0.005):
+        if self.session is not None:
+            raise RuntimeError("Profiling is already running.")
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+
+        seconds = min(seconds, self.max_seconds)
+        session = ProfilingSession(mode, seconds, updates, interval)
+        if mode == "sample":
+            session.start_sampler()
+        self.session = session
+        self._timer = asyncio.get_running_loop().call_later(seconds, self.stop)
+        logging.info(
+            f"CPU profiling ({mode}) started for {seconds} s"
+            f"{f' or {updates} updates' if updates else ''}."
+        )
+        return session
+
+    def stop(self):
+        session = self.session
+        if session is None:
+            return None
+        self.session = None
+        self._timer.cancel()
+        session.stop_sampler()
+
+        try:
+            path = session.save(self.directory)
+        except OSError as e:
+            logging.exception("Failed to save CPU profile.")
+            session.done.set_exception(e)
+            return session
+        report = session.summary()
+        logging.info(f"{report}\nSaved to {path}")
+        session.done.set_result((report, path))
+        return session
+
+    async def close(self):
+        self.stop()
+
+    async def __call__(self, handler, event, data):
+        session = self.session
+        if session is None:
+            return await handler(event, data)
+
+        name = data["handler"].callback.__name__
+        if session.mode == "sample":
+            profile = None
+        else:
+            profile = session.profiles[name]
+
+        def enter():
+            session.current = name
+            if profile is not None:
+                profile.enable()
+
+        def leave():
+            if profile is not None:
+                profile.disable()
+            session.current = None
+
+        try:
+            return await _run_segments(handler(event, data), enter, leave)
+        finally:
+            session.handled[name] += 1
+            session.count += 1
+            if (
+                session.updates
+                and session.count >= session.updates
+                and self.session is session
+            ):
+                self.stop()
+
+
+def create_cpu_profiler():
+    return CPUProfiler(
+        directory=os.getenv("CPU_PROFILE_DIR", "profiles"),
+        max_seconds=float(os.getenv("CPU_PROFILE_MAX_SECONDS", "600")),
+    )
@@ -0,0 +1,113 @@
+import logging
+import os
+import tracemalloc
+
+from src.db.fsm_storage import storage_stats
+
+
+# Трассировка самого tracemalloc и импорта модулей в отчет не попадает
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _site(statistic):
+    frame = statistic.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+class MemoryTracker:
+    def __init__(self, storage, caches, frames=0, top=10):
+        # caches: {имя: функция без аргументов, возвращающая число записей}
+        self.storage = storage
+        self.caches = caches
+        self.frames = frames
+        self.top = top
+        self.fsm = {}
+        self.cache_sizes = {}
+        self.traced = 0
+        self.peak = 0
+        self.top_sites = []
+        self.growth = []
+        self._first = None
+        self._previous = None
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    async def start(self):
+        # tracemalloc замедляет выделение памяти, поэтому включается только
+        # при MEMORY_TRACE_FRAMES > 0
+        if self.frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._first = self._previous = self._snapshot()
+            logging.info(f"tracemalloc started with {self.frames} frames.")
+
+    async def stop(self):
+        if self._first is not None:
+            tracemalloc.stop()
+            self._first = self._previous = None
+
+    async def report(self):
+        self.fsm = await storage_stats(self.storage) or {}
+        self.cache_sizes = {name: size() for name, size in self.caches.items()}
+
+        lines = ["Memory report"]
+        for state, stats in sorted(self.fsm.items()):
+            lines.append(
+                f"FSM {state or '<no state>'}: {stats['entries']} entries, "
+                f"{stats['bytes']} bytes"
+            )
+        for name, size in self.cache_sizes.items():
+            lines.append(f"Cache {name}: {size} entries")
+
+        if self._first is not None:
+            snapshot = self._snapshot()
+            self.traced, self.peak = tracemalloc.get_traced_memory()
+            self.top_sites = snapshot.statistics("lineno")[: self.top]
+            # Рост с прошлого снимка показывает текущую утечку, а рост с
+            # запуска — накопленную
+            self.growth = [
+                diff
+                for diff in snapshot.compare_to(self._previous, "lineno")
+                if diff.size_diff > 0
+            ][: self.top]
+            since_start = {
+                _site(diff): diff.size_diff
+                for diff in snapshot.compare_to(self._first, "lineno")
+            }
+            self._previous = snapshot
+
+            lines.append(
+                f"Traced memory: {self.traced / 2**20:.1f} MiB, "
+                f"peak {self.peak / 2**20:.1f} MiB"
+            )
+            lines.append("Top allocation sites:")
+            lines.extend(
+                f"  {_site(stat)}: {stat.size / 1024:.1f} KiB "
+                f"in {stat.count} blocks"
+                for stat in self.top_sites
+            )
+            lines.append("Top growth since last report:")
+            lines.extend(
+                f"  {_site(diff)}: +{diff.size_diff / 1024:.1f} KiB "
+                f"(+{diff.count_diff} blocks), "
+                f"{since_start.get(_site(diff), 0) / 1024:+.1f} KiB "
+                "since start"
+                for diff in self.growth
+            )
+
+        logging.info("\n".join(lines))
+        return lines
+
+
+def create_memory_tracker(storage, caches):
+    return MemoryTracker(
+        storage,
+        caches,
+        frames=int(os.getenv("MEMORY_TRACE_FRAMES", "0")),
+        top=int(os.getenv("MEMORY_REPORT_TOP", "10")),
+    )
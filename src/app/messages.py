@@ -0,0 +1,85 @@
+from src.utils.scores import SUBJECT_NAMES
+from src.utils.specializations import specialization_names
+
+
+# Тексты сообщений собираются здесь без обращения к БД и Bot API,
+# чтобы их можно было отдельно измерять в benchmarks.hot_paths
+
+
+def format_profile(profile):
+    specializations = specialization_names(profile.specialization_mask)
+    scores = {
+        name: profile.scores.get(f"sub_{subject}")
+        for subject, name in SUBJECT_NAMES.items()
+    }
+
+    if (
+        profile.city is None
+        and not any(scores.values())
+        and not specializations
+        and profile.mean_value is None
+    ):
+        return None
+
+    city_message = (
+        f"Выбранный город: {profile.city}"
+        if profile.city
+        else "Выбранный город: не выбран"
+    )
+
+    scores_message = "\n".join(
+        f"{subject}: {score}"
+        for subject, score in scores.items()
+        if score is not None
+    )
+    scores_message = (
+        "Баллы ЕГЭ:\n" + scores_message
+        if scores_message
+        else "Баллы ЕГЭ: не указаны"
+    )
+
+    mean_value_message = (
+        f"Ваш средний балл: {profile.mean_value:.2f}"
+        if profile.mean_value is not None
+        else "Ваш средний балл: не указан"
+    )
+
+    spec_message = (
+        "Выбранные специализации: " + ", ".join(specializations)
+        if specializations
+        else "Специализации: не выбраны"
+    )
+
+    return (
+        f"{city_message}\n{scores_message}\n"
+        f"{mean_value_message}\n{spec_message}"
+    )
+
+
+def format_university_list(header, universities):
+    university_list = "\n".join(
+        f"{i + 1}. {university.name}"
+        for i, university in enumerate(universities)
+    )
+    return f"{header}\n{university_list}"
+
+
+def format_university(university):
+    all_specialties = specialization_names(university.specialization_mask)
+    specialties_text = (
+        ", ".join(all_specialties)
+        if all_specialties
+        else "Нет доступных специальностей"
+    )
+
+    return (
+        f"Название: {university.name}\n"
+        f"Количество бюджетных мест: {university.bud_places}\n"
+        f"Количество платных мест: {university.pay_places}\n"
+        "Необходимое количество баллов ЕГЭ для бюджета: "
+        f"{university.bud_score}\n"
+        "Необходимое количество баллов ЕГЭ для платного: "
+        f"{university.pay_score}\n"
+        f"Все специальности: {specialties_text}\n"
+        f"Ссылка: {university.url}"
+    )
@@ -0,0 +1,376 @@
+from bisect import bisect_left
+from collections import defaultdict
+import logging
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiohttp import web
+
+from src.db.engines import pool_stats
+from src.db.profiling import statement_fingerprint
+
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+def _state_name(state):
+    return state.state if isinstance(state, State) else state
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": bound}, cumulative
+        yield f"{name}_bucket", {**labels, "le": "+Inf"}, self.count
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+
+class Metrics:
+    def __init__(self):
+        self.update_latency = defaultdict(Histogram)
+        self.handler_latency = defaultdict(Histogram)
+        self.errors = defaultdict(int)
+        self.handler_statements = defaultdict(int)
+        self.transitions = defaultdict(int)
+        self.in_flight = 0
+        self._collectors = []
+
+    def add_collector(self, collector):
+        # collector() -> [(имя, тип, [(имя сэмпла, метки, значение)]), ...]
+        self._collectors.append(collector)
+
+    def _families(self):
+        yield "bot_updates_in_flight", "gauge", [
+            ("bot_updates_in_flight", {}, self.in_flight)
+        ]
+        yield "bot_update_duration_seconds", "histogram", [
+            sample
+            for event_type, histogram in self.update_latency.items()
+            for sample in histogram.samples(
+                "bot_update_duration_seconds", {"type": event_type}
+            )
+        ]
+        yield "bot_handler_duration_seconds", "histogram", [
+            sample
+            for handler, histogram in self.handler_latency.items()
+            for sample in histogram.samples(
+                "bot_handler_duration_seconds", {"handler": handler}
+            )
+        ]
+        yield "bot_handler_errors_total", "counter", [
+            (
+                "bot_handler_errors_total",
+                {"handler": handler, "error": error},
+                count,
+            )
+            for (handler, error), count in self.errors.items()
+        ]
+        yield "bot_handler_sql_statements_total", "counter", [
+            ("bot_handler_sql_statements_total", {"handler": handler}, count)
+            for handler, count in self.handler_statements.items()
+        ]
+        yield "bot_fsm_transitions_total", "counter", [
+            (
+                "bot_fsm_transitions_total",
+                {"from": old or "", "to": new or ""},
+                count,
+            )
+            for (old, new), count in self.transitions.items()
+        ]
+        for collector in self._collectors:
+            try:
+                yield from collector()
+            except Exception:
+                logging.exception("Metrics collector failed.")
+
+    def render(self):
+        lines = []
+        for name, metric_type, samples in self._families():
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(
+                f"{sample}{_labels(labels)} {value}"
+                for sample, labels, value in samples
+            )
+        return "\n".join(lines) + "\n"
+
+
+class TrackedFSMContext(FSMContext):
+    def __init__(self, storage, key, metrics, current_state):
+        super().__init__(storage, key)
+        self.metrics = metrics
+        self.current_state = current_state
+
+    async def set_state(self, state=None):
+        await super().set_state(state)
+        new_state = _state_name(state)
+        self.metrics.transitions[(self.current_state, new_state)] += 1
+        self.current_state = new_state
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    # Внешний middleware апдейтов: время обработки, апдейты в работе
+    # и переходы FSM
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    async def __call__(self, handler, event, data):
+        state = data.get("state")
+        if state is not None:
+            data["state"] = TrackedFSMContext(
+                state.storage, state.key, self.metrics, data.get("raw_state")
+            )
+
+        self.metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.metrics.in_flight -= 1
+            self.metrics.update_latency[event.event_type].observe(
+                time.perf_counter() - started
+            )
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    # Внутренний middleware: вызывается только для найденного обработчика
+    def __init__(self, metrics, profiler=None):
+        self.metrics = metrics
+        self.profiler = profiler
+
+    async def __call__(self, handler, event, data):
+        name = data["handler"].callback.__name__
+        token = self.profiler.start_update() if self.profiler else None
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            self.metrics.errors[(name, type(e).__name__)] += 1
+            raise
+        finally:
+            self.metrics.handler_latency[name].observe(
+                time.perf_counter() - started
+            )
+            if token is not None:
+                self.metrics.handler_statements[
+                    name
+                ] += self.profiler.finish_update(token, f"Handler {name}")
+
+
+def setup_metrics(dp, metrics, profiler=None):
+    dp.update.outer_middleware(UpdateMetricsMiddleware(metrics))
+    handler_middleware = HandlerMetricsMiddleware(metrics, profiler)
+    dp.message.middleware(handler_middleware)
+    dp.callback_query.middleware(handler_middleware)
+
+
+POOL_METRICS = (
+    ("size", "db_pool_size", "gauge"),
+    ("checked_out", "db_pool_checked_out", "gauge"),
+    ("overflow", "db_pool_overflow", "gauge"),
+    ("checkouts", "db_pool_checkouts_total", "counter"),
+    ("wait_time", "db_pool_wait_seconds_total", "counter"),
+    ("max_wait_time", "db_pool_max_wait_seconds", "gauge"),
+)
+
+
+def pool_collector():
+    stats = pool_stats()
+    for field, name, metric_type in POOL_METRICS:
+        yield name, metric_type, [
+            (name, {"url": url}, values[field])
+            for url, values in stats.items()
+        ]
+
+
+SCHEDULER_METRICS = (
+    ("runs", "scheduler_job_runs_total", "counter"),
+    ("failures", "scheduler_job_failures_total", "counter"),
+    ("timeouts", "scheduler_job_timeouts_total", "counter"),
+    ("skipped", "scheduler_job_skipped_total", "counter"),
+    ("last_duration", "scheduler_job_last_duration_seconds", "gauge"),
+    ("max_duration", "scheduler_job_max_duration_seconds", "gauge"),
+    ("mean_duration", "scheduler_job_mean_duration_seconds", "gauge"),
+)
+
+
+def scheduler_collector(scheduler):
+    def collect():
+        stats = scheduler.stats()
+        # Длительности появляются после первого запуска задачи
+        for field, name, metric_type in SCHEDULER_METRICS:
+            yield name, metric_type, [
+                (name, {"job": job}, values[field])
+                for job, values in stats.items()
+                if values[field] is not None
+            ]
+
+    return collect
+
+
+def profile_collector(profiles):
+    def collect():
+        for name, metric_type, value in (
+            ("profile_cache_hits_total", "counter", profiles.hits),
+            ("profile_cache_misses_total", "counter", profiles.misses),
+            ("profile_cache_entries", "gauge", len(profiles)),
+        ):
+            yield name, metric_type, [(name, {}, value)]
+
+    return collect
+
+
+STATEMENT_LABELS = ("fingerprint", "verb", "table")
+
+
+def statement_collector(profiler):
+    def collect():
+        # Текст запроса в метке раздувает ответ и число рядов в Prometheus,
+        # поэтому метки — хэш, команда и таблица
+        statements = [
+            (
+                dict(zip(STATEMENT_LABELS, statement_fingerprint(statement))),
+                stats,
+            )
+            for statement, stats in list(profiler.statements.items())
+        ]
+        yield "sql_statements_total", "counter", [
+            ("sql_statements_total", labels, stats.count)
+            for labels, stats in statements
+        ]
+        yield "sql_statement_seconds_total", "counter", [
+            ("sql_statement_seconds_total", labels, stats.total_time)
+            for labels, stats in statements
+        ]
+        for name, metric_type, value in (
+            ("sql_slow_queries_total", "counter", profiler.slow_queries),
+            (
+                "sql_updates_over_statement_limit_total",
+                "counter",
+                profiler.updates_over_limit,
+            ),
+            (
+                "sql_max_statements_per_update",
+                "gauge",
+                profiler.max_update_statements,
+            ),
+        ):
+            yield name, metric_type, [(name, {}, value)]
+
+    return collect
+
+
+def memory_collector(tracker):
+    def collect():
+        # Состояние FSM берется из последнего отчета, размеры кэшей — сразу
+        fsm = list(tracker.fsm.items())
+        yield "fsm_storage_entries", "gauge", [
+            ("fsm_storage_entries", {"state": state}, stats["entries"])
+            for state, stats in fsm
+        ]
+        yield "fsm_storage_data_bytes", "gauge", [
+            ("fsm_storage_data_bytes", {"state": state}, stats["bytes"])
+            for state, stats in fsm
+        ]
+        yield "cache_entries", "gauge", [
+            ("cache_entries", {"cache": name}, size())
+            for name, size in tracker.caches.items()
+        ]
+        yield "tracemalloc_traced_bytes", "gauge", [
+            ("tracemalloc_traced_bytes", {}, tracker.traced)
+        ]
+
+    return collect
+
+
+def eviction_collector(storage):
+    def collect():
+        yield "fsm_storage_evictions_total", "counter", [
+            (
+                "fsm_storage_evictions_total",
+                {"reason": reason, "state": state},
+                count,
+            )
+            for (reason, state), count in list(storage.evictions.items())
+        ]
+        yield "fsm_storage_size", "gauge", [
+            ("fsm_storage_size", {}, storage.size)
+        ]
+
+    return collect
+
+
+class MetricsServer:
+    def __init__(self, metrics, host="127.0.0.1", port=9101, path="/metrics"):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.path = path
+        self._runner = None
+
+    async def handle(self, request):
+        return web.Response(
+            body=self.metrics.render().encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get(self.path, self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(
+            f"Metrics are served on {self.host}:{self.port}{self.path}."
+        )
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+
+from aiogram import BaseMiddleware
+
+
+FORMAT_VERSION = 1
+# Поля с именами и контактами в запись не попадают
+PERSONAL_FIELDS = frozenset(
+    {
+        "first_name",
+        "last_name",
+        "username",
+        "title",
+        "bio",
+        "phone_number",
+        "contact",
+        "location",
+    }
+)
+# Объекты, чей id заменяется псевдонимом
+ACTOR_FIELDS = frozenset({"from", "chat", "user", "sender_chat"})
+
+
+class UpdateRecorder(BaseMiddleware):
+    # Пишет входящие апдейты с отметкой времени в gzip-файл JSON-строк:
+    # первая строка — заголовок, далее {"t": секунды от начала, "update": ...}
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self.recorded = 0
+        # Соль живет только в памяти, поэтому псевдонимы стабильны внутри
+        # одной записи, но не связываются с настоящими id
+        self._salt = secrets.token_bytes(16)
+        self._started = None
+        self._file = None
+
+    def _pseudonym(self, value):
+        digest = hmac.new(
+            self._salt, str(value).encode(), hashlib.sha256
+        ).digest()
+        return int.from_bytes(digest[:4], "big") % 2_000_000_000 + 1
+
+    def anonymize(self, value, key=None):
+        if isinstance(value, list):
+            return [self.anonymize(item, key) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        result = {}
+        for name, item in value.items():
+            if name in PERSONAL_FIELDS:
+                continue
+            if name == "id" and key in ACTOR_FIELDS:
+                result[name] = self._pseudonym(item)
+            elif name == "chat_instance":
+                result[name] = str(self._pseudonym(item))
+            else:
+                result[name] = self.anonymize(item, name)
+        if key in ACTOR_FIELDS and "is_bot" in value:
+            result["first_name"] = "user"
+        return result
+
+    def record(self, update):
+        now = time.monotonic()
+        if self._file is None:
+            self._started = now
+            self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._write({"version": FORMAT_VERSION, "started": time.time()})
+
+        self._write(
+            {
+                "t": round(now - self._started, 4),
+                "update": self.anonymize(
+                    update.model_dump(
+                        mode="json", by_alias=True, exclude_none=True
+                    )
+                ),
+            }
+        )
+        self.recorded += 1
+        if self.recorded % self.flush_every == 0:
+            self._file.flush()
+
+    def _write(self, record):
+        self._file.write(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+            + "\n"
+        )
+
+    async def __call__(self, handler, event, data):
+        try:
+            self.record(event)
+        except Exception:
+            logging.exception("Failed to record update.")
+        return await handler(event, data)
+
+    async def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logging.info(f"Recorded {self.recorded} updates to {self.path}.")
+
+
+def read_recording(path):
+    records = []
+    offset = 0.0
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        try:
+            for record in map(json.loads, file):
+                if "update" in record:
+                    record["t"] += offset
+                    records.append(record)
+                    continue
+                if record.get("version") != FORMAT_VERSION:
+                    raise ValueError(
+                        "Unsupported recording version: "
+                        f"{record.get('version')}"
+                    )
+                # Файл дописывается при каждом запуске бота: следующий сеанс
+                # идет сразу после предыдущего
+                offset = records[-1]["t"] if records else 0.0
+        except (EOFError, json.JSONDecodeError):
+            # Хвост файла обрывается, если бот был остановлен аварийно
+            logging.warning(
+                f"Recording {path} is truncated after {len(records)} updates."
+            )
+    return records
+
+
+def create_recorder():
+    path = os.getenv("UPDATE_RECORD_FILE")
+    if not path:
+        return None
+    logging.info(f"Recording incoming updates to {path}.")
+    return UpdateRecorder(path)
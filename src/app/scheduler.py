@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import random
+import time
+
+
+class Job:
+    def __init__(self, name, func, interval, jitter=0.1, timeout=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.skipped = 0
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.lock = asyncio.Lock()
+
+    def next_delay(self):
+        # Разброс не дает нескольким процессам ходить в БД одновременно
+        spread = self.interval * self.jitter
+        return max(self.interval + random.uniform(-spread, spread), 0)
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "last_duration": self.last_duration,
+            "max_duration": self.max_duration,
+            "mean_duration": (
+                self.total_duration / self.runs if self.runs else None
+            ),
+        }
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs = {}
+        self._tasks = []
+
+    def add_job(self, name, func, interval, jitter=0.1, timeout=None):
+        if interval <= 0:
+            logging.info(f"Job {name} is disabled.")
+            return None
+        job = self.jobs[name] = Job(name, func, interval, jitter, timeout)
+        return job
+
+    async def run(self, name):
+        job = self.jobs[name]
+        # Один запуск задачи за раз: если прошлый еще идет, пропускаем
+        if job.lock.locked():
+            job.skipped += 1
+            logging.warning(f"Job {name} is still running, skipping.")
+            return False
+
+        async with job.lock:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(job.func(), job.timeout)
+            except asyncio.TimeoutError:
+                job.timeouts += 1
+                logging.error(f"Job {name} timed out after {job.timeout}s.")
+            except Exception:
+                job.failures += 1
+                logging.exception(f"Job {name} failed.")
+            finally:
+                duration = time.perf_counter() - started
+                job.runs += 1
+                job.last_duration = duration
+                job.total_duration += duration
+                job.max_duration = max(job.max_duration, duration)
+                logging.info(f"Job {name} took {duration * 1000:.1f} ms.")
+        return True
+
+    async def _loop(self, job):
+        while True:
+            await asyncio.sleep(job.next_delay())
+            await self.run(job.name)
+
+    async def start(self):
+        self._tasks = [
+            asyncio.create_task(self._loop(job)) for job in self.jobs.values()
+        ]
+        logging.info(f"Scheduler started with {len(self._tasks)} jobs.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logging.info("Scheduler stopped.")
+
+    def stats(self):
+        return {name: job.stats() for name, job in self.jobs.items()}
@@ -0,0 +1,307 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.fsm.storage.base import BaseStorage
+from sqlalchemy import event
+
+from src.db.fsm_storage import storage_stats
+
+
+SERVICE_NAME = "university-telegram-bot"
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    __slots__ = (
+        "trace",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "attributes",
+        "start",
+        "end",
+        "error",
+    )
+
+    def __init__(self, trace, parent_id, name, kind, attributes):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start = time.time_ns()
+        self.end = None
+        self.error = None
+
+    def child(self, name, kind=SPAN_KIND_INTERNAL, **attributes):
+        span = Span(self.trace, self.span_id, name, kind, attributes)
+        self.trace.spans.append(span)
+        return span
+
+    def finish(self, error=None):
+        self.end = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end or time.time_ns()),
+            "attributes": [
+                _attribute(key, value)
+                for key, value in self.attributes.items()
+            ],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return span
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans = []
+
+
+class Tracer:
+    def __init__(self, path, sample_rate=0.01):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.exported = 0
+        self._file = None
+
+    def start_trace(self, name, **attributes):
+        # Решение о записи принимается один раз на апдейт
+        if random.random() >= self.sample_rate:
+            return None
+        trace = Trace()
+        span = Span(trace, None, name, SPAN_KIND_SERVER, attributes)
+        trace.spans.append(span)
+        return span
+
+    def export(self, trace):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        # Одна строка на трассу в формате OTLP/JSON (ExportTraceServiceRequest)
+        record = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _attribute("service.name", SERVICE_NAME)
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in trace.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.exported += 1
+
+    async def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def attach(self, engine):
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "begin", self._begin)
+        event.listen(sync_engine, "commit", self._end_transaction)
+        event.listen(sync_engine, "rollback", self._end_transaction)
+        event.listen(sync_engine, "before_cursor_execute", self._before)
+        event.listen(sync_engine, "after_cursor_execute", self._after)
+        event.listen(sync_engine, "handle_error", self._error)
+
+    def _begin(self, conn):
+        parent = _current_span.get()
+        if parent is not None:
+            conn.info["trace_transaction"] = parent.child(
+                "db.transaction",
+                SPAN_KIND_CLIENT,
+                **{"db.system": conn.engine.dialect.name},
+            )
+
+    def _end_transaction(self, conn):
+        span = conn.info.pop("trace_transaction", None)
+        if span is not None:
+            span.finish()
+
+    def _before(self, conn, cursor, statement, parameters, context, many):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        span = parent.child(
+            "db.statement",
+            SPAN_KIND_CLIENT,
+            **{
+                "db.system": conn.engine.dialect.name,
+                "db.statement": statement[:500],
+                "db.executemany": bool(many),
+            },
+        )
+        conn.info.setdefault("trace_statements", []).append(span)
+
+    def _after(self, conn, cursor, statement, parameters, context, many):
+        spans = conn.info.get("trace_statements")
+        if spans:
+            spans.pop().finish()
+
+    def _error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("trace_statements"):
+            connection.info["trace_statements"].pop().finish(
+                exception_context.original_exception
+            )
+
+
+async def traced(name, call, kind=SPAN_KIND_INTERNAL, **attributes):
+    parent = _current_span.get()
+    if parent is None:
+        return await call()
+
+    span = parent.child(name, kind, **attributes)
+    token = _current_span.set(span)
+    try:
+        result = await call()
+    except Exception as e:
+        span.finish(e)
+        raise
+    finally:
+        _current_span.reset(token)
+    span.finish()
+    return result
+
+
+class UpdateTracingMiddleware(BaseMiddleware):
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    async def __call__(self, handler, event, data):
+        span = self.tracer.start_trace(
+            f"update {event.event_type}",
+            **{"update.id": event.update_id, "update.type": event.event_type},
+        )
+        if span is None:
+            return await handler(event, data)
+
+        token = _current_span.set(span)
+        try:
+            result = await handler(event, data)
+        except Exception as e:
+            span.finish(e)
+            raise
+        else:
+            span.finish()
+        finally:
+            _current_span.reset(token)
+            try:
+                self.tracer.export(span.trace)
+            except OSError:
+                logging.exception("Failed to export trace.")
+        return result
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event, data):
+        name = data["handler"].callback.__name__
+        return await traced(
+            f"handler {name}",
+            lambda: handler(event, data),
+            **{"handler.name": name},
+        )
+
+
+class BotAPITracingMiddleware(BaseRequestMiddleware):
+    async def __call__(self, make_request, bot, method):
+        return await traced(
+            f"bot_api {method.__api_method__}",
+            lambda: make_request(bot, method),
+            SPAN_KIND_CLIENT,
+            **{"telegram.method": method.__api_method__},
+        )
+
+
+class TracedStorage(BaseStorage):
+    # Обертка над FSM-хранилищем: каждое чтение и запись становится спаном
+    def __init__(self, storage):
+        self.storage = storage
+
+    async def get_state(self, key):
+        return await traced(
+            "fsm.get_state", lambda: self.storage.get_state(key)
+        )
+
+    async def set_state(self, key, state=None):
+        return await traced(
+            "fsm.set_state", lambda: self.storage.set_state(key, state)
+        )
+
+    async def get_data(self, key):
+        return await traced("fsm.get_data", lambda: self.storage.get_data(key))
+
+    async def set_data(self, key, data):
+        return await traced(
+            "fsm.set_data", lambda: self.storage.set_data(key, data)
+        )
+
+    async def stats(self):
+        return await storage_stats(self.storage)
+
+    async def close(self):
+        await self.storage.close()
+
+
+def create_tracer():
+    sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    if sample_rate <= 0:
+        return None
+    path = os.getenv("TRACE_FILE", "traces.jsonl")
+    logging.info(f"Tracing {sample_rate:.1%} of updates to {path}.")
+    return Tracer(path, sample_rate)
+
+
+def setup_tracing(dp, bot, tracer):
+    # Трасса должна начинаться раньше FSM middleware, иначе чтение состояния
+    # в нее не попадет, поэтому диспетчер создается с disable_fsm=True,
+    # а FSM middleware регистрируется здесь после трассировки
+    dp.update.outer_middleware(UpdateTracingMiddleware(tracer))
+    dp.update.outer_middleware(dp.fsm)
+    handler_middleware = HandlerTracingMiddleware()
+    dp.message.middleware(handler_middleware)
+    dp.callback_query.middleware(handler_middleware)
+    bot.session.middleware(BotAPITracingMiddleware())
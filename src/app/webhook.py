@@ -0,0 +1,151 @@
+import asyncio
+import hmac
+import logging
+import os
+import signal
+
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
+
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    def __init__(
+        self,
+        dp,
+        bot,
+        path="/webhook",
+        secret_token=None,
+        workers=16,
+        queue_size=1000,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._worker_tasks = []
+        self._runner = None
+
+    async def handle(self, request):
+        # Сравнение за постоянное время не выдает секрет по задержке ответа
+        if self.secret_token and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, "").encode(),
+            self.secret_token.encode(),
+        ):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(
+                await request.json(), context={"bot": self.bot}
+            )
+        except (ValueError, ValidationError):
+            logging.warning("Rejected malformed webhook update.")
+            return web.Response(status=400)
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # Telegram повторит доставку апдейта позже
+            logging.warning("Webhook queue is full, rejecting update.")
+            return web.Response(status=503)
+        return web.Response()
+
+    async def _worker(self):
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception:
+                logging.exception(
+                    f"Failed to process update {update.update_id}"
+                )
+            finally:
+                self.queue.task_done()
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    async def start(self, host, port):
+        self._worker_tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        logging.info(
+            f"Webhook server listening on {host}:{port}{self.path} "
+            f"with {self.workers} workers."
+        )
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+        # Досчитываем уже принятые апдейты, затем останавливаем воркеры
+        await self.queue.join()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+
+async def run_webhook(dp, bot):
+    path = os.getenv("WEBHOOK_PATH", "/webhook")
+    secret_token = os.getenv("WEBHOOK_SECRET") or None
+    server = WebhookServer(
+        dp,
+        bot,
+        path=path,
+        secret_token=secret_token,
+        workers=int(os.getenv("WEBHOOK_WORKERS", "16")),
+        queue_size=int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000")),
+    )
+
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow_data)
+
+    # Docker останавливает контейнер сигналом SIGTERM: без обработчика
+    # процесс завершится, не досчитав очередь и не сбросив буфер профилей
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    signals = []
+    # Если сервер не запустится (порт занят, set_webhook не прошел),
+    # обработчики остановки все равно выполнятся
+    try:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, stop_event.set)
+            except NotImplementedError:
+                # Windows: остается остановка через KeyboardInterrupt
+                continue
+            signals.append(signum)
+
+        await server.start(
+            os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+            int(os.getenv("WEBHOOK_PORT", "8080")),
+        )
+
+        webhook_url = os.getenv("WEBHOOK_URL")
+        if webhook_url:
+            await bot.set_webhook(
+                url=webhook_url.rstrip("/") + path,
+                secret_token=secret_token,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+
+        await stop_event.wait()
+        logging.info("Stopping webhook server.")
+    finally:
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+        await server.stop()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
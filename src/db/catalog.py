@@ -0,0 +1,144 @@
+from array import array
+import base64
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import compress
+import logging
+
+from sqlalchemy import select
+
+from src.db.universities import Moscow, SessionLocalUniversity
+
+
+University = namedtuple(
+    "University",
+    [
+        "ID",
+        "name",
+        "coast",
+        "bud_places",
+        "pay_places",
+        "bud_score",
+        "pay_score",
+        "url",
+        "specialization_mask",
+    ],
+)
+
+
+PAGE_SIZE = 5
+
+
+def pack_ids(university_ids):
+    return base64.b64encode(array("I", university_ids).tobytes()).decode()
+
+
+def unpack_ids(packed):
+    university_ids = array("I")
+    university_ids.frombytes(base64.b64decode(packed))
+    return university_ids
+
+
+class ScoreIndex:
+    def __init__(self, entries):
+        # entries: (проходной балл, ID, маска специализаций). Вузы хранятся
+        # по убыванию балла (при равных баллах — по ID), а для бисекции
+        # баллы хранятся с обратным знаком, чтобы массив возрастал
+        entries = sorted(entries, key=lambda entry: (-entry[0], entry[1]))
+        self.negated_scores = array("d", (-score for score, _, _ in entries))
+        self.ids = array(
+            "q", (university_id for _, university_id, _ in entries)
+        )
+        self.masks = array("q", (mask for _, _, mask in entries))
+
+    def __len__(self):
+        return len(self.negated_scores)
+
+    def below(self, mean_value, specialization_mask=0):
+        # Все вузы, у которых проходной балл не выше среднего балла, от
+        # самого высокого балла к низкому: поиск стоит бисекции и среза
+        # без сортировки, маски фильтруются по параллельному массиву без
+        # обращения к словарю вузов
+        start = bisect_left(self.negated_scores, -mean_value)
+        if not specialization_mask:
+            return self.ids[start:]
+        return array(
+            "q",
+            compress(
+                self.ids[start:],
+                (mask & specialization_mask for mask in self.masks[start:]),
+            ),
+        )
+
+
+class UniversityCatalog:
+    def __init__(self):
+        self.universities = {}
+        self.budget = ScoreIndex([])
+        self.paid = ScoreIndex([])
+
+    async def load(self):
+        async with SessionLocalUniversity() as session:
+            result = await session.execute(
+                select(
+                    Moscow.ID,
+                    Moscow.name,
+                    Moscow.coast,
+                    Moscow.bud_places,
+                    Moscow.pay_places,
+                    Moscow.bud_score,
+                    Moscow.pay_score,
+                    Moscow.url,
+                    Moscow.specialization_mask,
+                    Moscow.bud_score_num,
+                    Moscow.pay_score_num,
+                ).order_by(Moscow.ID)
+            )
+            rows = result.all()
+
+        self.build(
+            (University(*row[:9]), row.bud_score_num, row.pay_score_num)
+            for row in rows
+        )
+        logging.info(
+            f"University catalog loaded: {len(self.universities)} "
+            f"universities, {len(self.budget)} budget and "
+            f"{len(self.paid)} paid thresholds"
+        )
+
+    def build(self, entries):
+        universities = {}
+        budget_entries = []
+        paid_entries = []
+        for university, bud_score, pay_score in entries:
+            universities[university.ID] = university
+            entry = (university.ID, university.specialization_mask or 0)
+            if bud_score is not None:
+                budget_entries.append((bud_score, *entry))
+            if pay_score is not None:
+                paid_entries.append((pay_score, *entry))
+
+        # Подменяем целиком, чтобы поиск не видел частично собранный индекс
+        self.universities = universities
+        self.budget = ScoreIndex(budget_entries)
+        self.paid = ScoreIndex(paid_entries)
+
+    def get(self, university_id):
+        return self.universities.get(university_id)
+
+    def search_budget(self, mean_value, specialization_mask=0):
+        return self.budget.below(mean_value, specialization_mask)
+
+    def search_paid(self, mean_value, specialization_mask=0):
+        return self.paid.below(mean_value, specialization_mask)
+
+    def page(self, university_ids, page):
+        start_index = page * PAGE_SIZE
+        universities = (
+            self.universities.get(university_id)
+            for university_id in university_ids[
+                start_index : start_index + PAGE_SIZE
+            ]
+        )
+        # Вуз мог пропасть из каталога после его обновления
+        return [university for university in universities if university]
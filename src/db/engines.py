@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.db.profiling import profiler
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # Считает, сколько запросы ждут свободное соединение из пула
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def recreate(self):
+        # При пересоздании пула (dispose) статистика сохраняется
+        pool = super().recreate()
+        pool.checkouts = self.checkouts
+        pool.wait_time = self.wait_time
+        pool.max_wait_time = self.max_wait_time
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+
+
+_engines = {}
+
+
+def pool_options():
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    }
+
+
+def get_engine(url):
+    # Один движок и один пул соединений на каждый URL
+    url = make_url(url)
+    key = url.render_as_string(hide_password=False)
+    engine = _engines.get(key)
+    if engine is not None:
+        return engine
+
+    options = {"echo": os.getenv("DB_ECHO", "0") == "1"}
+    if url.get_backend_name() == "sqlite" and url.database in (
+        None,
+        "",
+        ":memory:",
+    ):
+        # База в памяти живет в одном соединении, пул ей не нужен
+        pass
+    else:
+        options.update(poolclass=TimedQueuePool, **pool_options())
+
+    engine = _engines[key] = create_async_engine(url, **options)
+    if os.getenv("SQL_PROFILE", "1") == "1":
+        profiler.attach(engine)
+    logging.info(f"Created engine for {url}.")
+    return engine
+
+
+def engines():
+    return list(_engines.values())
+
+
+def pool_stats():
+    stats = {}
+    for engine in _engines.values():
+        pool = engine.pool
+        if not isinstance(pool, TimedQueuePool):
+            continue
+        stats[repr(engine.url)] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "checkouts": pool.checkouts,
+            "wait_time": pool.wait_time,
+            "max_wait_time": pool.max_wait_time,
+        }
+    return stats
+
+
+def log_pool_stats():
+    for url, stats in pool_stats().items():
+        mean_wait = (
+            stats["wait_time"] / stats["checkouts"] * 1000
+            if stats["checkouts"]
+            else 0
+        )
+        logging.info(
+            f"Pool {url}: size {stats['size']}, "
+            f"checked out {stats['checked_out']}, "
+            f"overflow {stats['overflow']}, "
+            f"mean wait {mean_wait:.2f} ms, "
+            f"max wait {stats['max_wait_time'] * 1000:.2f} ms."
+        )
+
+
+async def _ping(engine):
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def warm_up_pools():
+    # Открываем столько соединений, сколько держит пул, чтобы после
+    # простоя первые апдейты не ждали подключения к БД
+    for engine in _engines.values():
+        size = (
+            engine.pool.size()
+            if isinstance(engine.pool, TimedQueuePool)
+            else 1
+        )
+        await asyncio.gather(*(_ping(engine) for _ in range(size)))
+
+
+async def dispose_engines():
+    for engine in _engines.values():
+        await engine.dispose()
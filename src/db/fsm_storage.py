@@ -0,0 +1,355 @@
+from abc import abstractmethod
+import asyncio
+from collections import Counter, OrderedDict
+import contextvars
+import json
+import logging
+import os
+import time
+import zlib
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder
+from aiogram.fsm.storage.memory import MemoryStorage
+
+
+_prefetched = contextvars.ContextVar("fsm_prefetched", default=None)
+
+
+def _state_name(state):
+    return state.state if isinstance(state, State) else state
+
+
+class PrefetchStorage(BaseStorage):
+    def __init__(self, key_builder=None):
+        self.key_builder = key_builder or DefaultKeyBuilder()
+
+    @abstractmethod
+    async def _read(self, storage_key):
+        # -> (состояние, данные) по ключу
+        pass
+
+    @abstractmethod
+    async def _write(self, storage_key, field, value):
+        # field: "state" или "data"
+        pass
+
+    async def get_state(self, key):
+        storage_key = self.key_builder.build(key)
+        state, data = await self._read(storage_key)
+        # FSM middleware читает состояние до обработчика, а обработчик почти
+        # всегда читает данные, поэтому берем их за тот же запрос
+        _prefetched.set((self, storage_key, data))
+        return state
+
+    async def get_data(self, key):
+        storage_key = self.key_builder.build(key)
+        prefetched = _prefetched.get()
+        if (
+            prefetched is not None
+            and prefetched[0] is self
+            and prefetched[1] == storage_key
+        ):
+            return dict(prefetched[2])
+
+        _, data = await self._read(storage_key)
+        return data
+
+    async def set_state(self, key, state=None):
+        await self._write(
+            self.key_builder.build(key), "state", _state_name(state)
+        )
+
+    async def set_data(self, key, data):
+        storage_key = self.key_builder.build(key)
+        await self._write(
+            storage_key,
+            "data",
+            (
+                json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+                if data
+                else None
+            ),
+        )
+        _prefetched.set((self, storage_key, dict(data)))
+
+
+class RedisHashStorage(PrefetchStorage):
+    def __init__(self, redis, key_builder=None, state_ttl=None):
+        super().__init__(key_builder)
+        self.redis = redis
+        self.state_ttl = state_ttl
+
+    @classmethod
+    def from_url(
+        cls, url, key_builder=None, state_ttl=None, **connection_kwargs
+    ):
+        from redis.asyncio import Redis
+
+        redis = Redis.from_url(url, decode_responses=True, **connection_kwargs)
+        return cls(redis, key_builder=key_builder, state_ttl=state_ttl)
+
+    async def _read(self, storage_key):
+        state, data = await self.redis.hmget(storage_key, "state", "data")
+        return state, json.loads(data) if data else {}
+
+    async def _write(self, storage_key, field, value):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if value is None:
+                pipe.hdel(storage_key, field)
+            else:
+                pipe.hset(storage_key, field, value)
+            if self.state_ttl:
+                pipe.expire(storage_key, self.state_ttl)
+            await pipe.execute()
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+class SQLiteStorage(PrefetchStorage):
+    def __init__(self, path, key_builder=None):
+        super().__init__(key_builder)
+        self.path = path
+        self._connection = None
+        self._connect_lock = asyncio.Lock()
+
+    async def _connect(self):
+        if self._connection is not None:
+            return self._connection
+
+        async with self._connect_lock:
+            if self._connection is None:
+                import aiosqlite
+
+                connection = await aiosqlite.connect(self.path)
+                await connection.execute("PRAGMA journal_mode=WAL")
+                await connection.execute("PRAGMA synchronous=NORMAL")
+                await connection.execute(
+                    "CREATE TABLE IF NOT EXISTS fsm_storage ("
+                    "key TEXT PRIMARY KEY, state TEXT, data TEXT)"
+                )
+                await connection.commit()
+                self._connection = connection
+        return self._connection
+
+    async def _read(self, storage_key):
+        connection = await self._connect()
+        async with connection.execute(
+            "SELECT state, data FROM fsm_storage WHERE key = ?",
+            (storage_key,),
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None, {}
+        state, data = row
+        return state, json.loads(data) if data else {}
+
+    async def _write(self, storage_key, field, value):
+        connection = await self._connect()
+        await connection.execute(
+            f"INSERT INTO fsm_storage (key, {field}) VALUES (?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET {field} = excluded.{field}",
+            (storage_key, value),
+        )
+        await connection.commit()
+
+    async def stats(self):
+        connection = await self._connect()
+        async with connection.execute(
+            "SELECT state, COUNT(*), COALESCE(SUM(LENGTH(data)), 0) "
+            "FROM fsm_storage GROUP BY state"
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return {
+            state or "": {"entries": entries, "bytes": size}
+            for state, entries, size in rows
+        }
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+class StorageEntry:
+    __slots__ = ("state", "data", "touched")
+
+    def __init__(self):
+        self.state = None
+        self.data = None
+        self.touched = 0.0
+
+
+class BoundedMemoryStorage(PrefetchStorage):
+    # Хранилище в памяти процесса с ограничением числа записей (LRU) и
+    # временем простоя по состояниям. В отличие от MemoryStorage, записи не
+    # создаются при чтении и удаляются после state.clear()
+    def __init__(
+        self,
+        key_builder=None,
+        max_entries=100000,
+        idle_ttl=None,
+        state_ttls=None,
+        compress_min_size=256,
+    ):
+        super().__init__(key_builder)
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.state_ttls = state_ttls or {}
+        self.compress_min_size = compress_min_size
+        self.evictions = Counter()
+        self._entries = OrderedDict()
+
+    @property
+    def size(self):
+        # Не __len__: Dispatcher подменяет пустое (ложное) хранилище
+        # на MemoryStorage
+        return len(self._entries)
+
+    def _ttl(self, state):
+        # TTL 0 у состояния отключает для него истечение
+        return self.state_ttls.get(state or "", self.idle_ttl) or None
+
+    def _encode(self, data):
+        # Данные хранятся в байтах компактного JSON, крупные (списки
+        # результатов поиска) дополнительно сжимаются; сжатые данные
+        # отличаются первым байтом: JSON-объект начинается с "{"
+        raw = data.encode()
+        if len(raw) >= self.compress_min_size:
+            return zlib.compress(raw, 1)
+        return raw
+
+    def _decode(self, raw):
+        if raw[:1] != b"{":
+            raw = zlib.decompress(raw)
+        return json.loads(raw)
+
+    def _evict(self, storage_key, reason):
+        entry = self._entries.pop(storage_key)
+        self.evictions[(reason, entry.state or "")] += 1
+
+    def _expired(self, entry, now):
+        ttl = self._ttl(entry.state)
+        return ttl is not None and now - entry.touched >= ttl
+
+    async def _read(self, storage_key):
+        entry = self._entries.get(storage_key)
+        if entry is None:
+            return None, {}
+        now = time.monotonic()
+        if self._expired(entry, now):
+            self._evict(storage_key, "expired")
+            return None, {}
+        entry.touched = now
+        self._entries.move_to_end(storage_key)
+        return entry.state, self._decode(entry.data) if entry.data else {}
+
+    async def _write(self, storage_key, field, value):
+        entry = self._entries.get(storage_key)
+        if entry is None:
+            if value is None:
+                return
+            entry = self._entries[storage_key] = StorageEntry()
+        if field == "data" and value is not None:
+            value = self._encode(value)
+        setattr(entry, field, value)
+
+        if entry.state is None and entry.data is None:
+            del self._entries[storage_key]
+            return
+        entry.touched = time.monotonic()
+        self._entries.move_to_end(storage_key)
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)), "lru")
+
+    def sweep(self):
+        # Записи упорядочены по последнему обращению: дальше самой короткой
+        # TTL просмотр не идет
+        ttls = [
+            ttl for ttl in (self.idle_ttl, *self.state_ttls.values()) if ttl
+        ]
+        if not ttls:
+            return 0
+        now = time.monotonic()
+        horizon = now - min(ttls)
+        expired = []
+        for storage_key, entry in self._entries.items():
+            if entry.touched > horizon:
+                break
+            if self._expired(entry, now):
+                expired.append(storage_key)
+        for storage_key in expired:
+            self._evict(storage_key, "expired")
+        return len(expired)
+
+    async def stats(self):
+        stats = {}
+        for entry in list(self._entries.values()):
+            state = stats.setdefault(
+                entry.state or "", {"entries": 0, "bytes": 0}
+            )
+            state["entries"] += 1
+            state["bytes"] += len(entry.data or b"")
+        return stats
+
+    async def close(self):
+        self._entries.clear()
+
+
+def parse_state_ttls(value):
+    # "waiting_for_budget_choice=900,Form:subject=3600" -> {состояние: TTL}
+    state_ttls = {}
+    for item in value.split(","):
+        if item.strip():
+            state, ttl = item.rsplit("=", 1)
+            state_ttls[state.strip()] = float(ttl)
+    return state_ttls
+
+
+def memory_storage_stats(storage):
+    # Записи MemoryStorage создаются даже для пользователей без состояния
+    # (чтение состояния FSM middleware) и никогда не удаляются
+    stats = {}
+    for record in list(storage.storage.values()):
+        state = stats.setdefault(
+            record.state or "", {"entries": 0, "bytes": 0}
+        )
+        state["entries"] += 1
+        if record.data:
+            state["bytes"] += len(
+                json.dumps(record.data, ensure_ascii=False).encode()
+            )
+    return stats
+
+
+async def storage_stats(storage):
+    # Состояния и размер данных FSM по состояниям; данные считаются в байтах
+    # JSON. Для Redis возвращается None: данные хранятся вне процесса
+    if isinstance(storage, MemoryStorage):
+        return memory_storage_stats(storage)
+    stats = getattr(storage, "stats", None)
+    return await stats() if stats is not None else None
+
+
+def create_storage():
+    backend = os.getenv("FSM_STORAGE", "memory")
+
+    if backend == "redis":
+        storage = RedisHashStorage.from_url(
+            os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0"),
+            state_ttl=int(os.getenv("FSM_STATE_TTL", "0")) or None,
+        )
+    elif backend == "bounded":
+        storage = BoundedMemoryStorage(
+            max_entries=int(os.getenv("FSM_MAX_ENTRIES", "100000")),
+            idle_ttl=float(os.getenv("FSM_STATE_TTL", "0")) or None,
+            state_ttls=parse_state_ttls(os.getenv("FSM_STATE_TTLS", "")),
+        )
+    elif backend == "sqlite":
+        storage = SQLiteStorage(os.getenv("FSM_SQLITE_PATH", "fsm.sqlite3"))
+    else:
+        storage = MemoryStorage()
+
+    logging.info(f"Using {type(storage).__name__} for FSM storage.")
+    return storage
@@ -0,0 +1,29 @@
+from sqlalchemy import BigInteger, Column, Float, Index, Integer, String
+from sqlalchemy.orm import declarative_base
+
+
+# Модель каталога без движка: ее используют и асинхронный бот, и
+# синхронный парсер
+Base = declarative_base()
+
+
+class Moscow(Base):
+    __tablename__ = "moscow"
+    # По уникальному названию парсер обновляет вузы, а не добавляет
+    # повторно при каждом запуске
+    __table_args__ = (Index("ux_moscow_name", "name", unique=True),)
+
+    ID = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(255), nullable=False)
+    coast = Column(String(255), nullable=True)
+    bud_places = Column(String(255), nullable=True)
+    pay_places = Column(String(255), nullable=True)
+    bud_score = Column(String(255), nullable=True)
+    pay_score = Column(String(255), nullable=True)
+    url = Column(String(255), nullable=True)
+    coast_num = Column(Integer, nullable=True, index=True)
+    bud_places_num = Column(Integer, nullable=True)
+    pay_places_num = Column(Integer, nullable=True)
+    bud_score_num = Column(Float, nullable=True, index=True)
+    pay_score_num = Column(Float, nullable=True, index=True)
+    specialization_mask = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,427 @@
+import asyncio
+from collections import defaultdict, namedtuple, OrderedDict
+import functools
+import logging
+import os
+import time
+
+from sqlalchemy import bindparam, case, delete, func, select
+
+from src.db.users import (
+    SessionLocalUsers,
+    Specialization,
+    Subject,
+    upsert,
+    User,
+)
+from src.utils.specializations import SPECIALIZATION_BITS
+
+
+Profile = namedtuple(
+    "Profile", ["city", "scores", "mean_value", "specialization_mask"]
+)
+EMPTY_PROFILE = Profile(None, {}, None, 0)
+
+SUBJECT_COLUMNS = [
+    column.name
+    for column in Subject.__table__.columns
+    if column.name.startswith("sub_")
+]
+
+
+_SET_CITY = upsert(
+    User.__table__,
+    {"tg_id": bindparam("tg_id"), "city": bindparam("city")},
+    {"city": bindparam("city")},
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _scores_upsert(subject_columns):
+    # Сумма и количество баллов хранятся в строке, поэтому среднее
+    # пересчитывается тем же запросом без чтения остальных предметов.
+    # MySQL в ON DUPLICATE KEY UPDATE видит уже присвоенные значения,
+    # поэтому сами баллы присваиваются последними: тогда все выражения
+    # читают старые значения на любой СУБД
+    subjects = Subject.__table__
+    scores = {column: bindparam(column) for column in subject_columns}
+    added = sum(scores.values())
+    score_sum = subjects.c.score_sum + added
+    score_count = subjects.c.score_count
+    for column in subject_columns:
+        previous = subjects.c[column]
+        score_sum = score_sum - func.coalesce(previous, 0)
+        score_count = score_count + case((previous.is_(None), 1), else_=0)
+
+    return upsert(
+        subjects,
+        {
+            "tg_id": bindparam("tg_id"),
+            **scores,
+            "score_sum": added,
+            "score_count": len(scores),
+            "mean_value": added * 3.0 / len(scores),
+        },
+        {
+            "mean_value": score_sum * 3.0 / score_count,
+            "score_sum": score_sum,
+            "score_count": score_count,
+            **scores,
+        },
+    )
+
+
+_DELETE_SUBJECTS = delete(Subject.__table__).where(
+    Subject.__table__.c.tg_id == bindparam("tg_id")
+)
+_DELETE_USERS = delete(User.__table__).where(
+    User.__table__.c.tg_id == bindparam("tg_id")
+)
+
+
+def compute_mean(scores):
+    return (sum(scores.values()) / len(scores)) * 3 if scores else None
+
+
+def _subject_scores(subject):
+    if subject is None:
+        return {}
+    scores = {column: getattr(subject, column) for column in SUBJECT_COLUMNS}
+    return {
+        column: score for column, score in scores.items() if score is not None
+    }
+
+
+def _change(**fields):
+    # Изменение профиля: очистка, затем город, баллы и специализации
+    return {
+        "clear": False,
+        "scores": {},
+        "specializations": frozenset(),
+        **fields,
+    }
+
+
+def _merge_changes(older, newer):
+    if newer["clear"]:
+        return dict(newer)
+    merged = _change(
+        clear=older["clear"],
+        scores={**older["scores"], **newer["scores"]},
+        specializations=older["specializations"] | newer["specializations"],
+    )
+    for change in (older, newer):
+        if "city" in change:
+            merged["city"] = change["city"]
+    return merged
+
+
+def _apply_change(profile, change):
+    if change["clear"]:
+        profile = EMPTY_PROFILE
+    if "city" in change:
+        profile = profile._replace(city=change["city"])
+    if change["scores"]:
+        scores = {**profile.scores, **change["scores"]}
+        profile = profile._replace(
+            scores=scores, mean_value=compute_mean(scores)
+        )
+    mask = profile.specialization_mask
+    for column in change["specializations"]:
+        mask |= SPECIALIZATION_BITS[column]
+    return profile._replace(specialization_mask=mask)
+
+
+class ProfileStore:
+    def __init__(
+        self,
+        schema,
+        max_size=10000,
+        ttl=300,
+        write_behind=False,
+        flush_interval=0.5,
+        flush_size=500,
+    ):
+        self.schema = schema
+        self.max_size = max_size
+        self.ttl = ttl
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.flushed_users = 0
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._pending = {}
+        self._flushing = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._flusher = None
+
+    @classmethod
+    def from_env(cls, schema):
+        return cls(
+            schema,
+            max_size=int(os.getenv("PROFILE_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("PROFILE_CACHE_TTL", "300")),
+            write_behind=os.getenv("PROFILE_WRITE_BEHIND", "0") == "1",
+            flush_interval=float(os.getenv("PROFILE_FLUSH_INTERVAL", "0.5")),
+            flush_size=int(os.getenv("PROFILE_FLUSH_SIZE", "500")),
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def pending_users(self):
+        # Пользователи с изменениями, еще не записанными в БД
+        return len(self._pending) + len(self._flushing)
+
+    def _lookup(self, tg_id):
+        entry = self._entries.get(tg_id)
+        if entry is None:
+            return None
+        expires_at, profile = entry
+        if expires_at <= time.monotonic():
+            del self._entries[tg_id]
+            return None
+        self._entries.move_to_end(tg_id)
+        return profile
+
+    def _store(self, tg_id, profile):
+        self._entries[tg_id] = (time.monotonic() + self.ttl, profile)
+        self._entries.move_to_end(tg_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _written(self, tg_id, update=None):
+        # Загрузка, начатая до записи, не должна положить в кэш старые данные
+        if tg_id in self._loading:
+            self._loading[tg_id] = False
+
+        profile = self._lookup(tg_id)
+        if update is None:
+            self._entries.pop(tg_id, None)
+        elif profile is not None:
+            profile = update(profile)
+            self._store(tg_id, profile)
+            return profile
+        return None
+
+    async def _load(self, tg_id):
+        async with SessionLocalUsers() as session:
+            city = await session.scalar(
+                select(User.city).filter_by(tg_id=tg_id)
+            )
+            subject = (
+                (await session.execute(select(Subject).filter_by(tg_id=tg_id)))
+                .scalars()
+                .first()
+            )
+            specialization_mask = await session.scalar(
+                select(Specialization.specialization_mask).filter_by(
+                    tg_id=tg_id
+                )
+            )
+        return Profile(
+            city,
+            _subject_scores(subject),
+            subject.mean_value if subject else None,
+            specialization_mask or 0,
+        )
+
+    async def _load_mean(self, tg_id):
+        # Для среднего нужны только баллы: один SELECT вместо загрузки
+        # всего профиля, несохраненные баллы накладываются сверху
+        pending = self._pending_change(tg_id) or _change()
+        scores = {}
+        if not pending["clear"]:
+            async with SessionLocalUsers() as session:
+                subject = (
+                    (
+                        await session.execute(
+                            select(Subject).filter_by(tg_id=tg_id)
+                        )
+                    )
+                    .scalars()
+                    .first()
+                )
+            scores = _subject_scores(subject)
+        return compute_mean({**scores, **pending["scores"]})
+
+    def _pending_change(self, tg_id):
+        # Несохраненные изменения, в том числе из идущего сейчас сброса
+        changes = [
+            change
+            for change in (self._flushing.get(tg_id), self._pending.get(tg_id))
+            if change is not None
+        ]
+        if not changes:
+            return None
+        merged = _change()
+        for change in changes:
+            merged = _merge_changes(merged, change)
+        return merged
+
+    async def get(self, tg_id):
+        profile = self._lookup(tg_id)
+        if profile is not None:
+            self.hits += 1
+            return profile
+
+        self.misses += 1
+        pending = self._pending_change(tg_id)
+        self._loading[tg_id] = True
+        try:
+            profile = await self._load(tg_id)
+        finally:
+            fresh = self._loading.pop(tg_id, False)
+        # Пользователь видит свои изменения, даже если они еще не в БД
+        if pending is not None:
+            profile = _apply_change(profile, pending)
+        if fresh:
+            self._store(tg_id, profile)
+        return profile
+
+    async def _execute(self, session, changes):
+        cleared = [
+            {"tg_id": tg_id}
+            for tg_id, change in changes.items()
+            if change["clear"]
+        ]
+        if cleared:
+            await session.execute(self.schema.clear_specializations, cleared)
+            await session.execute(_DELETE_SUBJECTS, cleared)
+            await session.execute(_DELETE_USERS, cleared)
+
+        cities = [
+            {"tg_id": tg_id, "city": change["city"]}
+            for tg_id, change in changes.items()
+            if "city" in change
+        ]
+        if cities:
+            await session.execute(_SET_CITY, cities)
+
+        # Одинаковые наборы столбцов уходят одним executemany
+        scores = defaultdict(list)
+        specializations = defaultdict(list)
+        for tg_id, change in changes.items():
+            if change["scores"]:
+                scores[tuple(sorted(change["scores"]))].append(
+                    {"tg_id": tg_id, **change["scores"]}
+                )
+            for column in change["specializations"]:
+                specializations[column].append({"tg_id": tg_id})
+
+        for columns, params in scores.items():
+            await session.execute(_scores_upsert(columns), params)
+        for column, params in specializations.items():
+            await session.execute(
+                self.schema.set_specialization(column), params
+            )
+
+    async def _write(self, tg_id, change):
+        if self.write_behind:
+            pending = self._pending.get(tg_id)
+            self._pending[tg_id] = (
+                change if pending is None else _merge_changes(pending, change)
+            )
+            if len(self._pending) >= self.flush_size:
+                self._flush_requested.set()
+        else:
+            async with SessionLocalUsers() as session:
+                async with session.begin():
+                    await self._execute(session, {tg_id: change})
+
+        return self._written(
+            tg_id, lambda profile: _apply_change(profile, change)
+        )
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            changes = self._flushing = self._pending
+            self._pending = {}
+            try:
+                async with SessionLocalUsers() as session:
+                    async with session.begin():
+                        await self._execute(session, changes)
+            except BaseException:
+                # Несохраненные изменения возвращаются перед более новыми
+                for tg_id, change in self._pending.items():
+                    older = self._flushing.get(tg_id)
+                    self._flushing[tg_id] = (
+                        change
+                        if older is None
+                        else _merge_changes(older, change)
+                    )
+                self._pending = self._flushing
+                raise
+            finally:
+                self._flushing = {}
+
+            self.flushes += 1
+            self.flushed_users += len(changes)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Failed to flush buffered profile writes.")
+
+    async def start(self):
+        if self.write_behind and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+            logging.info(
+                f"Profile write-behind enabled: flush every "
+                f"{self.flush_interval}s or {self.flush_size} users."
+            )
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+
+    async def set_city(self, tg_id, city):
+        await self._write(tg_id, _change(city=city))
+
+    async def set_score(self, tg_id, subject, score):
+        await self.set_scores(tg_id, {subject: score})
+        logging.info(f"User {tg_id} updated {subject} with score {score}")
+
+    async def set_scores(self, tg_id, scores):
+        # Все баллы и среднее записываются одним запросом; возвращается
+        # новое среднее, из кэша, если профиль в нем есть
+        profile = await self._write(
+            tg_id,
+            _change(
+                scores={
+                    f"sub_{subject}": score
+                    for subject, score in scores.items()
+                }
+            ),
+        )
+        if profile is not None:
+            return profile.mean_value
+        return await self._load_mean(tg_id)
+
+    async def add_specialization(self, tg_id, specialization):
+        await self._write(
+            tg_id, _change(specializations=frozenset([specialization]))
+        )
+
+    async def clear(self, tg_id):
+        await self._write(tg_id, _change(clear=True))
@@ -0,0 +1,159 @@
+import contextvars
+import functools
+import hashlib
+import logging
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+
+_update_statements = contextvars.ContextVar("update_statements", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|:\w+")
+_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_VALUES = re.compile(
+    r"(VALUES\s*\(\?(?:,\s*\?)*\))(?:\s*,\s*\(\?(?:,\s*\?)*\))+"
+)
+_SPACES = re.compile(r"\s+")
+_VERB = re.compile(r"^\W*(\w+)")
+_TABLE = re.compile(
+    r"\b(?:FROM|INTO|UPDATE|TABLE|JOIN|ON)\s+[`\"]?(\w+)", re.IGNORECASE
+)
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize_statement(statement):
+    # Литералы и параметры заменяются на ?, списки IN и многострочные
+    # VALUES сворачиваются, чтобы одинаковые запросы попадали в одну группу
+    statement = _SPACES.sub(" ", statement).strip()
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _LIST.sub("(...)", statement)
+    return _VALUES.sub(r"\1, ...", statement)
+
+
+@functools.lru_cache(maxsize=2048)
+def statement_fingerprint(normalized):
+    # Короткие метки запроса для метрик: хэш нормализованного текста,
+    # команда и первая таблица. Полный текст по хэшу находится в логе
+    verb = _VERB.match(normalized)
+    table = _TABLE.search(normalized)
+    return (
+        hashlib.sha1(normalized.encode()).hexdigest()[:12],
+        verb[1].upper() if verb else "",
+        table[1].lower() if table else "",
+    )
+
+
+class StatementStats:
+    __slots__ = ("count", "total_time", "max_time")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+
+class StatementProfiler:
+    def __init__(self, slow_query_time=0.2, update_statement_limit=10):
+        self.slow_query_time = slow_query_time
+        self.update_statement_limit = update_statement_limit
+        self.statements = {}
+        self.slow_queries = 0
+        self.updates = 0
+        self.update_statements = 0
+        self.max_update_statements = 0
+        self.updates_over_limit = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            slow_query_time=float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+            / 1000,
+            update_statement_limit=int(
+                os.getenv("SQL_UPDATE_STATEMENT_LIMIT", "10")
+            ),
+        )
+
+    def attach(self, engine):
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before)
+        event.listen(sync_engine, "after_cursor_execute", self._after)
+        event.listen(sync_engine, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("statement_started", []).append(
+            time.perf_counter()
+        )
+
+    def _after(self, conn, cursor, statement, parameters, context, many):
+        duration = time.perf_counter() - conn.info["statement_started"].pop()
+        normalized = normalize_statement(statement)
+        stats = self.statements.get(normalized)
+        if stats is None:
+            stats = self.statements[normalized] = StatementStats()
+        stats.count += 1
+        stats.total_time += duration
+        stats.max_time = max(stats.max_time, duration)
+
+        counter = _update_statements.get()
+        if counter is not None:
+            counter[0] += 1
+
+        if duration >= self.slow_query_time:
+            self.slow_queries += 1
+            logging.warning(
+                f"Slow query [{statement_fingerprint(normalized)[0]}] "
+                f"({duration * 1000:.1f} ms"
+                f"{', executemany' if many else ''}): {normalized}"
+            )
+
+    def _error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("statement_started"):
+            connection.info["statement_started"].pop()
+
+    def start_update(self):
+        # Счетчик запросов текущего апдейта живет в contextvar и виден
+        # обработчикам событий SQLAlchemy внутри той же задачи
+        return _update_statements.set([0])
+
+    def finish_update(self, token, description):
+        count = _update_statements.get()[0]
+        _update_statements.reset(token)
+
+        self.updates += 1
+        self.update_statements += count
+        self.max_update_statements = max(self.max_update_statements, count)
+        if count > self.update_statement_limit:
+            self.updates_over_limit += 1
+            logging.warning(
+                f"{description} ran {count} SQL statements "
+                f"(limit {self.update_statement_limit})."
+            )
+        return count
+
+    def top(self, limit=10):
+        return sorted(
+            self.statements.items(),
+            key=lambda item: item[1].total_time,
+            reverse=True,
+        )[:limit]
+
+    def log_stats(self, limit=10):
+        for statement, stats in self.top(limit):
+            logging.info(
+                f"[{statement_fingerprint(statement)[0]}] "
+                f"{stats.count} x {stats.total_time * 1000:.1f} ms total, "
+                f"{stats.max_time * 1000:.1f} ms max: {statement}"
+            )
+
+
+load_dotenv()
+profiler = StatementProfiler.from_env()
@@ -0,0 +1,39 @@
+from sqlalchemy import bindparam, column, table, text
+
+from src.db.users import upsert
+from src.utils.specializations import SPECIALIZATION_BITS
+
+
+class SchemaRegistry:
+    # Схема специализаций пользователя фиксирована (битовая маска), поэтому
+    # запросы компилируются один раз при запуске, без чтения схемы из БД
+    def __init__(self):
+        self.clear_specializations = None
+        self._set_specialization = {}
+        self._compile()
+
+    def set_specialization(self, column_name):
+        return self._set_specialization.get(column_name)
+
+    def _compile(self):
+        self.clear_specializations = text(
+            "UPDATE specializations SET specialization_mask = 0 "
+            "WHERE tg_id = :tg_id"
+        )
+
+        # Строка создается тем же запросом, если ее еще нет
+        specializations = table(
+            "specializations", column("tg_id"), column("specialization_mask")
+        )
+        self._set_specialization = {
+            column_name: upsert(
+                specializations,
+                {"tg_id": bindparam("tg_id"), "specialization_mask": bit},
+                {
+                    "specialization_mask": (
+                        specializations.c.specialization_mask.op("|")(bit)
+                    )
+                },
+            )
+            for column_name, bit in SPECIALIZATION_BITS.items()
+        }
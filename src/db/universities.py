@@ -1,50 +1,134 @@
+import logging
 import os
 
 from dotenv import load_dotenv
-from sqlalchemy import Column, Integer, String, text
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import bindparam, inspect, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 
+from src.db.engines import get_engine
+from src.db.models import Moscow
+from src.utils.normalize import normalize_university
+from src.utils.specializations import mask_expression
+
 
 load_dotenv()
 DATABASE_URI = os.getenv("UNIV_SQL_URL")
-engine = create_async_engine(DATABASE_URI, echo=True)
+engine = get_engine(DATABASE_URI)
 SessionLocalUniversity = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
-Base = declarative_base()
+NUMERIC_COLUMNS = {
+    "coast_num": "INTEGER NULL",
+    "bud_places_num": "INTEGER NULL",
+    "pay_places_num": "INTEGER NULL",
+    "bud_score_num": "FLOAT NULL",
+    "pay_score_num": "FLOAT NULL",
+}
+MASK_COLUMNS = {"specialization_mask": "BIGINT NOT NULL DEFAULT 0"}
+
+
+def _get_columns(sync_conn):
+    return [col["name"] for col in inspect(sync_conn).get_columns("moscow")]
+
+
+def _add_missing_columns(sync_conn, columns):
+    # Возвращает добавленные столбцы: данные переносятся только в них
+    existing_columns = _get_columns(sync_conn)
+    added_columns = []
+    for column_name, column_type in columns.items():
+        if column_name not in existing_columns:
+            sync_conn.execute(
+                text(
+                    f"ALTER TABLE moscow ADD COLUMN {column_name} "
+                    f"{column_type}"
+                )
+            )
+            added_columns.append(column_name)
+            logging.info(f"Added column {column_name} to table moscow.")
+    return added_columns
+
 
+def _create_indexes(sync_conn):
+    # Уникальный индекс по названию создает парсер: бот не меняет данные
+    # каталога, а на старых данных с повторами индекс не создастся
+    for index in Moscow.__table__.indexes:
+        if not index.unique:
+            index.create(sync_conn, checkfirst=True)
 
-class Moscow(Base):
-    __tablename__ = "moscow"
 
-    ID = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String(255), nullable=False)
-    coast = Column(String(255), nullable=True)
-    bud_places = Column(String(255), nullable=True)
-    pay_places = Column(String(255), nullable=True)
-    bud_score = Column(String(255), nullable=True)
-    pay_score = Column(String(255), nullable=True)
-    url = Column(String(255), nullable=True)
+async def backfill_numeric_columns():
+    async with engine.begin() as conn:
+        added_columns = await conn.run_sync(
+            _add_missing_columns, NUMERIC_COLUMNS
+        )
+        await conn.run_sync(_create_indexes)
+        # Новые строки заполняет парсер; строки, текст которых не
+        # разбирается ("от ?", "нет данных"), не перечитываются при
+        # каждом запуске
+        if not added_columns:
+            return
 
+        result = await conn.execute(
+            select(
+                Moscow.ID,
+                Moscow.coast,
+                Moscow.bud_places,
+                Moscow.pay_places,
+                Moscow.bud_score,
+                Moscow.pay_score,
+            ).where(
+                or_(
+                    *(
+                        getattr(Moscow, column_name).is_(None)
+                        for column_name in NUMERIC_COLUMNS
+                    )
+                )
+            )
+        )
+        rows = [
+            {"row_id": row.ID, **normalize_university(*row[1:])}
+            for row in result.all()
+        ]
 
-async def get_specialization_mapping(session: AsyncSession):
-    query = (
-        "SELECT column_name FROM information_schema.columns "
-        "WHERE table_name = 'moscow'"
-    )
+        if rows:
+            await conn.execute(
+                update(Moscow)
+                .where(Moscow.ID == bindparam("row_id"))
+                .values(
+                    {
+                        column_name: bindparam(column_name)
+                        for column_name in NUMERIC_COLUMNS
+                    }
+                ),
+                rows,
+            )
+        logging.info(f"Backfilled numeric columns for {len(rows)} rows.")
 
-    result = await session.execute(text(query))
 
-    specialization_mapping = {}
-    for row in result.fetchall():
-        column_name = row[0]
-        if column_name.startswith("spec_"):
-            specialization_key = column_name[5:]
-            specialization_mapping[specialization_key] = column_name
+async def migrate_specialization_masks():
+    async with engine.begin() as conn:
+        # Маска собирается из столбцов spec_* один раз, когда столбец
+        # появляется; дальше ее поддерживает парсер
+        if not await conn.run_sync(_add_missing_columns, MASK_COLUMNS):
+            return
+        existing_columns = await conn.run_sync(_get_columns)
+        spec_columns = [
+            column for column in existing_columns if column.startswith("spec_")
+        ]
+        if not spec_columns:
+            return
 
-    return specialization_mapping
+        await conn.execute(
+            text(
+                "UPDATE moscow SET specialization_mask = "
+                f"{mask_expression(spec_columns)}"
+            )
+        )
+        logging.info(
+            f"Migrated {len(spec_columns)} specialization columns of table "
+            "moscow to specialization_mask."
+        )
 
 
 # Создание новой таблицы
@@ -4,15 +4,17 @@ import os
 
 
 from dotenv import load_dotenv
-from sqlalchemy import BigInteger, inspect, String, text
+from sqlalchemy import BigInteger, String
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     AsyncAttrs,
     AsyncSession,
-    create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+from src.db.engines import get_engine
+
 
 load_dotenv()
 
@@ -20,16 +22,12 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
 
-engine_users = create_async_engine(os.getenv("USER_SQL_URL"), echo=True)
-engine_univs = create_async_engine(os.getenv("UNIV_SQL_URL"), echo=True)
+engine_users = get_engine(os.getenv("USER_SQL_URL"))
 
 
 SessionLocalUsers = async_sessionmaker(
     engine_users, class_=AsyncSession, expire_on_commit=False
 )
-SessionLocalUnivs = async_sessionmaker(
-    engine_univs, class_=AsyncSession, expire_on_commit=False
-)
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -40,7 +38,7 @@ class User(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    tg_id = mapped_column(BigInteger)
+    tg_id = mapped_column(BigInteger, unique=True, index=True)
     city: Mapped[str] = mapped_column(String(25), nullable=True)
 
 
@@ -48,7 +46,7 @@ class Subject(Base):
     __tablename__ = "subjects"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    tg_id = mapped_column(BigInteger)
+    tg_id = mapped_column(BigInteger, unique=True, index=True)
     sub_rus: Mapped[int] = mapped_column(nullable=True)
     sub_math: Mapped[int] = mapped_column(nullable=True)
     sub_math_prof: Mapped[int] = mapped_column(nullable=True)
@@ -65,6 +63,8 @@ class Subject(Base):
     sub_span: Mapped[int] = mapped_column(nullable=True)
     sub_chi: Mapped[int] = mapped_column(nullable=True)
     sub_lit: Mapped[int] = mapped_column(nullable=True)
+    score_sum: Mapped[int] = mapped_column(default=0, server_default="0")
+    score_count: Mapped[int] = mapped_column(default=0, server_default="0")
     mean_value: Mapped[float] = mapped_column(nullable=True)
 
 
@@ -72,7 +72,33 @@ class Specialization(Base):
     __tablename__ = "specializations"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    tg_id = mapped_column(BigInteger)
+    tg_id = mapped_column(BigInteger, unique=True, index=True)
+    specialization_mask: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0"
+    )
+
+
+def upsert(table, values, update):
+    # Одна команда вместо select + insert/update: запись по уникальному
+    # tg_id атомарна и не требует чтения строки
+    if engine_users.dialect.name in ("mysql", "mariadb"):
+        # Список пар сохраняет порядок присваиваний в ON DUPLICATE KEY UPDATE
+        return (
+            mysql.insert(table)
+            .values(values)
+            .on_duplicate_key_update(list(update.items()))
+        )
+
+    insert = (
+        postgresql.insert
+        if engine_users.dialect.name == "postgresql"
+        else sqlite.insert
+    )
+    return (
+        insert(table)
+        .values(values)
+        .on_conflict_do_update(index_elements=["tg_id"], set_=update)
+    )
 
 
 async def create_tables():
@@ -94,56 +120,10 @@ async def recreate_specializations_table():
         logging.info("Recreated the specializations table.")
 
 
-async def add_column_if_not_exists(table_name, column_name):
-    async with engine_users.connect() as connection:
-        existing_columns = await connection.run_sync(
-            lambda sync_conn: [
-                col["name"]
-                for col in inspect(sync_conn).get_columns(table_name)
-            ]
-        )
-
-        if column_name not in existing_columns:
-            alter_query = (
-                f"ALTER TABLE {table_name} ADD COLUMN {column_name} "
-                "BOOLEAN DEFAULT 0"
-            )
-            await connection.execute(text(alter_query))
-
-            logging.info(
-                f"Added column {column_name} to table {table_name} "
-                "with default value False (0)."
-            )
-
-
-async def get_specialization_columns_univs(session: AsyncSession):
-    query = (
-        "SELECT column_name FROM information_schema.columns "
-        "WHERE table_name = 'moscow'"
-    )
-    result = await session.execute(text(query))
-
-    specialization_columns = [
-        row[0] for row in result.fetchall() if row[0].startswith("spec_")
-    ]
-    return specialization_columns
-
-
-async def sync_specializations():
-    async with SessionLocalUnivs() as session_univs:
-        specialization_columns = await get_specialization_columns_univs(
-            session_univs
-        )
-        async with SessionLocalUsers():
-            for column_name in specialization_columns:
-                await add_column_if_not_exists("specializations", column_name)
-
-
 async def async_main():
     try:
         async with engine_users.begin():
             await recreate_specializations_table()
-            await sync_specializations()
     except Exception as e:
         logging.error(e)
 
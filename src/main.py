@@ -4,33 +4,173 @@ import os
 
 from aiogram import Bot, Dispatcher
 from dotenv import load_dotenv
-from sqlalchemy import text
 
+from src.app.admin import router as admin_router
+from src.app.cpu_profiler import create_cpu_profiler
 from src.app.handlers import router
-from db.universiries import SessionLocalUniversity
-from src.db.users import async_main, create_tables, SessionLocalUsers
+from src.app.memory import create_memory_tracker
+from src.app.metrics import (
+    eviction_collector,
+    memory_collector,
+    Metrics,
+    MetricsServer,
+    pool_collector,
+    profile_collector,
+    scheduler_collector,
+    setup_metrics,
+    statement_collector,
+)
+from src.app.recording import create_recorder
+from src.app.scheduler import Scheduler
+from src.app.tracing import create_tracer, setup_tracing, TracedStorage
+from src.app.webhook import run_webhook
+from src.db.catalog import UniversityCatalog
+from src.db.engines import (
+    dispose_engines,
+    engines,
+    log_pool_stats,
+    warm_up_pools,
+)
+from src.db.fsm_storage import BoundedMemoryStorage, create_storage
+from src.db.profiles import ProfileStore
+from src.db.profiling import normalize_statement, profiler
+from src.db.schema import SchemaRegistry
+from src.db.universities import (
+    backfill_numeric_columns,
+    migrate_specialization_masks,
+)
+from src.db.users import async_main, create_tables
 
 
-async def keep_db_connection_alive():
-    while True:
-        async with SessionLocalUsers() as session:
-            await session.execute(text("SELECT 1"))
-            print("reconnect to users")
-        async with SessionLocalUniversity as session:
-            await session.execute(text("SELECT 1"))
-            print("reconnect to univ")
-        await asyncio.sleep(300)
+def create_scheduler(catalog, memory, fsm_storage):
+    scheduler = Scheduler()
+    scheduler.add_job(
+        "warm_up_pools",
+        warm_up_pools,
+        interval=float(os.getenv("DB_WARM_UP_INTERVAL", "300")),
+        timeout=30,
+    )
+    scheduler.add_job(
+        "catalog_refresh",
+        catalog.load,
+        interval=float(os.getenv("CATALOG_REFRESH_INTERVAL", "3600")),
+        timeout=120,
+    )
+
+    async def report_pool_stats():
+        log_pool_stats()
+
+    scheduler.add_job(
+        "pool_stats",
+        report_pool_stats,
+        interval=float(os.getenv("POOL_STATS_INTERVAL", "300")),
+    )
+    scheduler.add_job(
+        "memory_report",
+        memory.report,
+        interval=float(os.getenv("MEMORY_REPORT_INTERVAL", "600")),
+        timeout=60,
+    )
+    if isinstance(fsm_storage, BoundedMemoryStorage):
+
+        async def sweep_fsm_storage():
+            expired = fsm_storage.sweep()
+            if expired:
+                logging.info(f"Removed {expired} expired FSM entries.")
+
+        scheduler.add_job(
+            "fsm_sweep",
+            sweep_fsm_storage,
+            interval=float(os.getenv("FSM_SWEEP_INTERVAL", "60")),
+        )
+    return scheduler
 
 
 async def main():
     await create_tables()
     load_dotenv()
     await async_main()
+    await backfill_numeric_columns()
+    await migrate_specialization_masks()
+    schema = SchemaRegistry()
+    catalog = UniversityCatalog()
+    await catalog.load()
+    profiles = ProfileStore.from_env(schema)
     bot = Bot(token=os.getenv("TOKEN"))
-    dp = Dispatcher()
+    cpu_profiler = create_cpu_profiler()
+    tracer = create_tracer()
+    fsm_storage = storage = create_storage()
+    if tracer is not None:
+        storage = TracedStorage(storage)
+    dp = Dispatcher(
+        storage=storage,
+        disable_fsm=tracer is not None,
+        catalog=catalog,
+        schema=schema,
+        profiles=profiles,
+        cpu_profiler=cpu_profiler,
+    )
+    # Команды администратора проверяются раньше обработчиков состояний
+    dp.include_router(admin_router)
     dp.include_router(router)
-    await dp.start_polling(bot)
-    asyncio.create_task(keep_db_connection_alive())
+    recorder = create_recorder()
+    if recorder is not None:
+        dp.update.outer_middleware(recorder)
+        dp.shutdown.register(recorder.close)
+    if tracer is not None:
+        for engine in engines():
+            tracer.attach(engine)
+        setup_tracing(dp, bot, tracer)
+        dp.shutdown.register(tracer.close)
+    memory = create_memory_tracker(
+        storage,
+        {
+            "profiles": lambda: len(profiles),
+            "profiles_pending": lambda: profiles.pending_users,
+            "catalog": lambda: len(catalog.universities),
+            "sql_statements": lambda: len(profiler.statements),
+            "sql_normalized": lambda: (
+                normalize_statement.cache_info().currsize
+            ),
+        },
+    )
+    scheduler = create_scheduler(catalog, memory, fsm_storage)
+    metrics = Metrics()
+    metrics.add_collector(pool_collector)
+    metrics.add_collector(scheduler_collector(scheduler))
+    metrics.add_collector(profile_collector(profiles))
+    metrics.add_collector(statement_collector(profiler))
+    metrics.add_collector(memory_collector(memory))
+    if isinstance(fsm_storage, BoundedMemoryStorage):
+        metrics.add_collector(eviction_collector(fsm_storage))
+    setup_metrics(dp, metrics, profiler)
+    # Профилировщик регистрируется последним, чтобы мерить только обработчик
+    dp.message.middleware(cpu_profiler)
+    dp.callback_query.middleware(cpu_profiler)
+    dp.shutdown.register(cpu_profiler.close)
+    metrics_port = int(os.getenv("METRICS_PORT", "0"))
+    if metrics_port:
+        metrics_server = MetricsServer(
+            metrics,
+            host=os.getenv("METRICS_HOST", "127.0.0.1"),
+            port=metrics_port,
+        )
+        dp.startup.register(metrics_server.start)
+        dp.shutdown.register(metrics_server.stop)
+    dp.startup.register(memory.start)
+    dp.shutdown.register(memory.stop)
+    dp.startup.register(scheduler.start)
+    dp.shutdown.register(scheduler.stop)
+    # Буфер отложенной записи сбрасывается при остановке бота
+    dp.startup.register(profiles.start)
+    dp.shutdown.register(profiles.close)
+    dp.shutdown.register(log_pool_stats)
+    dp.shutdown.register(profiler.log_stats)
+    dp.shutdown.register(dispose_engines)
+    if os.getenv("BOT_MODE", "polling") == "webhook":
+        await run_webhook(dp, bot)
+    else:
+        await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+import re
+
+
+def parse_score(value):
+    # Значения вида "от 245", "от ?" или "от -"
+    if not value or value.startswith("от ?"):
+        return None
+
+    parts = value.split(" ")
+    if len(parts) > 1 and parts[1] != "-":
+        try:
+            return float(parts[1])
+        except ValueError:
+            return None
+    return None
+
+
+def parse_number(value):
+    # Значения вида "120 000 ₽", "15 мест" или "150 000 – 300 000 ₽":
+    # берется первое число, разряды в котором разделены пробелами
+    if not value:
+        return None
+
+    number = re.search(r"\d[\d\s\u00a0]*", value)
+    return int(re.sub(r"\D", "", number.group())) if number else None
+
+
+def parse_fee_info(text):
+    # Блок карточки вуза на vuzopedia: стоимость, затем секции "Бюджет"
+    # и "Платное" с количеством мест и проходным баллом
+    info = {
+        "coast": None,
+        "bud_places": None,
+        "bud_score": None,
+        "pay_places": None,
+        "pay_score": None,
+    }
+    in_budget_section = False
+
+    for line in text.splitlines():
+        line = line.strip()
+
+        if line.endswith("₽"):
+            info["coast"] = line
+
+        if "Бюджет" in line:
+            in_budget_section = True
+
+        if in_budget_section:
+            if "Платное" in line:
+                in_budget_section = False
+
+            if line.endswith("мест"):
+                info["bud_places"] = line
+
+            if line.startswith("от"):
+                info["bud_score"] = line
+
+        else:
+            if line.endswith("мест"):
+                info["pay_places"] = line
+
+            if line.startswith("от"):
+                info["pay_score"] = line
+
+    return info
+
+
+def normalize_university(
+    coast=None,
+    bud_places=None,
+    pay_places=None,
+    bud_score=None,
+    pay_score=None,
+):
+    return {
+        "coast_num": parse_number(coast),
+        "bud_places_num": parse_number(bud_places),
+        "pay_places_num": parse_number(pay_places),
+        "bud_score_num": parse_score(bud_score),
+        "pay_score_num": parse_score(pay_score),
+    }
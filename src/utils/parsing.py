@@ -1,40 +1,24 @@
+import asyncio
 import os
-import re
-import time
 
 from dotenv import load_dotenv
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from sqlalchemy import Column, create_engine, inspect, Integer, String, text
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from src.db.models import Moscow
+from src.utils.normalize import normalize_university
+from src.utils.scraper import create_fetcher, scrape
+from src.utils.specializations import SPECIALIZATION_BITS
 
 
 load_dotenv()
 DATABASE_URI = os.getenv("UNIV_SQL_URL")
 engine = create_engine(DATABASE_URI, echo=True)
-Base = declarative_base()
-
-
-class Moscow(Base):
-    __tablename__ = "moscow"
-
-    ID = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String(255), nullable=False)
-    coast = Column(String(255), nullable=True)
-    bud_places = Column(String(255), nullable=True)
-    pay_places = Column(String(255), nullable=True)
-    bud_score = Column(String(255), nullable=True)
-    pay_score = Column(String(255), nullable=True)
-    url = Column(String(255), nullable=True)
 
 
-driver_path = os.getenv("DRIVER_PATH")
-service = Service(driver_path)
-driver = webdriver.Edge(service=service)
-
-
-def add_column_if_not_exists(table_name, column_name):
+def add_column_if_not_exists(
+    table_name, column_name, column_type="BOOLEAN DEFAULT FALSE"
+):
 
     inspector = inspect(engine)
     if column_name not in [
@@ -43,9 +27,11 @@ def add_column_if_not_exists(table_name, column_name):
         with engine.connect() as connection:
             connection.execute(
                 text(
-                    f"ALTER TABLE `{table_name}` ADD COLUMN `{column_name}` BOOLEAN DEFAULT FALSE"
+                    f"ALTER TABLE `{table_name}` ADD COLUMN `{column_name}` "
+                    f"{column_type}"
                 )
             )
+            connection.commit()
 
 
 #### Создание новой таблицы
@@ -54,179 +40,181 @@ def add_column_if_not_exists(table_name, column_name):
 # Base.metadata.create_all(engine)
 
 
-SessionUniversity2 = sessionmaker(bind=engine)
-session = SessionUniversity2()
-
-
-try:
-
-    for page in range(1, 17):
-
-        url = f"https://vuzopedia.ru/region/city/59?page={page}"
-        driver.get(url)
-
-        university_titles = driver.find_elements(By.CLASS_NAME, "itemVuzTitle")
-        print(university_titles)
-
-        add_info = driver.find_elements(By.CLASS_NAME, "col-md-2.optionVuzNew")
-
-        print(f"Страница {page}:")
-
-        for i in range(len(university_titles)):
-            title_element = university_titles[i]
-            title = title_element.text.strip()
-
-            try:
-                link_element = title_element.find_element(By.XPATH, "..")
-                url = link_element.get_attribute("href")
-            except Exception as e:
-                print(f"Не удалось найти ссылку для вуза '{title}': {e}")
-                url = "нет данных"
-
-            if i < len(add_info):
-                fee_info = add_info[i].text.strip()
-                coast = None
-                bud_places = None
-                bud_score = None
-                pay_places = None
-                pay_score = None
-
-                info_lines = fee_info.splitlines()
-
-                in_budget_section = False
-
-                for line in info_lines:
-                    line = line.strip()
-                    print(line)
-
-                    if line.endswith("₽"):
-                        coast = line
-
-                    if "Бюджет" in line:
-                        in_budget_section = True
-
-                    if in_budget_section:
-                        if "Платное" in line:
-                            in_budget_section = False
-
-                        if line.endswith("мест"):
-                            bud_places = line
-
-                        if line.startswith("от"):
-                            bud_score = line
-
-                    else:
-                        if line.endswith("мест"):
-                            pay_places = line
-
-                        if line.startswith("от"):
-                            pay_score = line
-
-                print(f"Название вуза: {title}")
-                print(f"URL вуза: {url}")
-                if coast:
-                    print(f"Стоимость обучения: {coast}")
-                else:
-                    print("Стоимость обучения: нет данных")
-
-                if bud_places:
-                    print(f"Бюджетные места: {bud_places}")
-                else:
-                    print("Бюджетные места: нет данных")
-
-                if bud_score:
-                    print(
-                        f"Бюджетные места (количество баллов егэ): {bud_score}"
-                    )
-                else:
-                    print(
-                        "Бюджетные места (количество баллов егэ): нет данных"
-                    )
-
-                if pay_places:
-                    print(f"Платные места: {pay_places}")
-                else:
-                    print("Платные места: нет данных")
-
-                if pay_score:
-                    print(
-                        f"Платные места (количество баллов егэ): {pay_score}"
-                    )
-                else:
-                    print("Платные места (количество баллов егэ): нет данных")
-
-                print("-" * 40)
-
-                new_university = Moscow(
-                    name=title,
-                    coast=coast,
-                    bud_places=bud_places,
-                    pay_places=pay_places,
-                    bud_score=bud_score,
-                    pay_score=pay_score,
-                    url=url,
+UPSERT_BATCH_SIZE = 500
+UPDATED_COLUMNS = (
+    "coast",
+    "bud_places",
+    "pay_places",
+    "bud_score",
+    "pay_score",
+    "url",
+    "coast_num",
+    "bud_places_num",
+    "pay_places_num",
+    "bud_score_num",
+    "pay_score_num",
+)
+
+
+def prepare_table():
+    for numeric_column in Moscow.__table__.columns:
+        if numeric_column.name.endswith("_num"):
+            add_column_if_not_exists(
+                "moscow",
+                numeric_column.name,
+                f"{numeric_column.type.compile(engine.dialect)} NULL",
+            )
+    add_column_if_not_exists(
+        "moscow", "specialization_mask", "BIGINT NOT NULL DEFAULT 0"
+    )
+    with engine.begin() as connection:
+        # Прошлые запуски добавляли вузы повторно: один раз, перед
+        # созданием уникального индекса, остается последняя загруженная
+        # строка каждого вуза. Вложенный подзапрос нужен MySQL, который не
+        # читает изменяемую таблицу
+        if not any(
+            index["name"] == "ux_moscow_name"
+            for index in inspect(connection).get_indexes("moscow")
+        ):
+            deleted = connection.execute(
+                text(
+                    "DELETE FROM moscow WHERE ID NOT IN (SELECT ID FROM "
+                    "(SELECT MAX(ID) AS ID FROM moscow GROUP BY name) AS kept)"
                 )
-                session.add(new_university)
-
-            else:
-                print(f"Название вуза: {title}, Информация: нет данных")
+            ).rowcount
+            print(f"Удалено повторов вузов: {deleted}")
+        for index in Moscow.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def upsert_universities(connection, rows):
+    table = Moscow.__table__
+    if engine.dialect.name in ("mysql", "mariadb"):
+        statement = mysql.insert(table)
+        statement = statement.on_duplicate_key_update(
+            {column: statement.inserted[column] for column in UPDATED_COLUMNS}
+        )
+    else:
+        insert = (
+            postgresql.insert
+            if engine.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=["name"],
+            set_={
+                column: statement.excluded[column]
+                for column in UPDATED_COLUMNS
+            },
+        )
 
-    for i in range(24):
-        url = "https://vuzopedia.ru/city/moskva"
-        driver.get(url)
+    # Многострочный INSERT пачками: одна команда на UPSERT_BATCH_SIZE вузов
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        connection.execute(
+            statement.values(rows[start : start + UPSERT_BATCH_SIZE])
+        )
 
-        cur_category_title = driver.find_elements(
-            By.CLASS_NAME, "vuzItemTitle"
-        )[i].text.strip()
-        print(cur_category_title)
 
-        cur_category_count = driver.find_elements(
-            By.CLASS_NAME, "cyrCountVUz"
-        )[i].text.strip()
-        cur_category_count = re.findall(r"\d+", cur_category_count)
-        if cur_category_count:
-            cur_category_count = int(cur_category_count[0])
-        else:
-            cur_category_count = 0
+def university_rows(universities):
+    # Повторы на разных страницах списка сливаются: в одной команде
+    # INSERT ... ON CONFLICT название не может встречаться дважды
+    rows = {}
+    for university in universities:
+        rows[university["name"]] = {
+            "name": university["name"],
+            "coast": university["coast"],
+            "bud_places": university["bud_places"],
+            "pay_places": university["pay_places"],
+            "bud_score": university["bud_score"],
+            "pay_score": university["pay_score"],
+            "url": university["url"],
+            **normalize_university(
+                coast=university["coast"],
+                bud_places=university["bud_places"],
+                pay_places=university["pay_places"],
+                bud_score=university["bud_score"],
+                pay_score=university["pay_score"],
+            ),
+        }
+    return list(rows.values())
+
+
+def category_updates(categories, university_ids):
+    # Столбцы категорий и биты маски собираются по вузам, чтобы каждая
+    # строка обновлялась один раз; вузы с одинаковым набором категорий
+    # уходят одним executemany
+    columns = {}
+    unknown = set()
+    for category_name, vuz_names in categories.items():
+        column_name = f"spec_{category_name}"
+        for vuz_name in vuz_names:
+            university_id = university_ids.get(vuz_name)
+            if university_id is None:
+                unknown.add(vuz_name)
+            else:
+                columns.setdefault(university_id, set()).add(column_name)
+
+    updates = {}
+    for university_id, university_columns in columns.items():
+        updates.setdefault(tuple(sorted(university_columns)), []).append(
+            {
+                "row_id": university_id,
+                "bit": sum(
+                    SPECIALIZATION_BITS.get(column, 0)
+                    for column in university_columns
+                ),
+            }
+        )
+    return updates, unknown
 
-        print(cur_category_count)
 
-        title_element = driver.find_elements(By.CLASS_NAME, "teloVuzItemMain")
-        link_element = title_element[i].find_element(By.XPATH, "..")
-        cur_url = link_element.get_attribute("href")
-        print(cur_url)
+def store_catalog(universities, categories):
+    for category_name in categories:
+        add_column_if_not_exists("moscow", f"spec_{category_name}")
 
-        category_name = cur_url.split("s=")[-1]
-        print(f"Category name for DB: {category_name}")
+    rows = university_rows(universities)
+    if len(rows) < len(universities):
+        print(
+            "Повторы вузов в списке объединены: "
+            f"{len(universities) - len(rows)}"
+        )
+    with engine.begin() as connection:
+        upsert_universities(connection, rows)
+        university_ids = {
+            name: university_id
+            for university_id, name in connection.execute(
+                select(Moscow.ID, Moscow.name)
+            )
+        }
 
-        column_name = f"spec_{category_name}"
-        add_column_if_not_exists("moscow", column_name)
+        updates, unknown = category_updates(categories, university_ids)
+        for columns, params in updates.items():
+            assignments = "".join(f"{column} = TRUE, " for column in columns)
+            connection.execute(
+                text(
+                    f"UPDATE moscow SET {assignments}"
+                    "specialization_mask = specialization_mask | :bit "
+                    "WHERE ID = :row_id"
+                ),
+                params,
+            )
 
-        vuz_per_page = 10
-        total_pages = (cur_category_count // vuz_per_page) + (
-            1 if cur_category_count % vuz_per_page > 0 else 0
-        )
+    print(f"Сохранено вузов: {len(rows)}, категорий: {len(categories)}")
+    if unknown:
+        print(f"Вузы категорий не найдены в списке: {len(unknown)}")
 
-        for page in range(1, total_pages + 1):
-            page_url = f"{cur_url}&page={page}"
-            driver.get(page_url)
 
-            time.sleep(2)
+async def fetch_catalog():
+    async with create_fetcher() as fetcher:
+        return await scrape(fetcher)
 
-            vuz_titles = driver.find_elements(By.CLASS_NAME, "itemVuzTitle")
-            for title in vuz_titles:
-                vuz_name = title.text.strip()
-                print(vuz_name)
 
-                session.execute(
-                    text(
-                        f"UPDATE moscow SET {column_name} = :value WHERE name = :name"
-                    ),
-                    {"value": True, "name": vuz_name},
-                )
+def main():
+    prepare_table()
+    universities, categories = asyncio.run(fetch_catalog())
+    store_catalog(universities, categories)
 
-        session.commit()
 
-finally:
-    session.commit()
-    driver.quit()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import re
+
+
+SUBJECT_NAMES = {
+    "rus": "Русский",
+    "math": "Математика",
+    "math_prof": "Математика профильная",
+    "phy": "Физика",
+    "chem": "Химия",
+    "hist": "История",
+    "soc": "Обществознание",
+    "inf": "Информатика",
+    "bio": "Биология",
+    "geo": "География",
+    "eng": "Английский",
+    "ger": "Немецкий",
+    "fren": "Французский",
+    "span": "Испанский",
+    "chi": "Китайский",
+    "lit": "Литература",
+}
+
+SUBJECT_ALIASES = {
+    "рус": "rus",
+    "мат": "math",
+    "мат_баз": "math",
+    "мат_проф": "math_prof",
+    "физ": "phy",
+    "хим": "chem",
+    "ист": "hist",
+    "общ": "soc",
+    "инф": "inf",
+    "био": "bio",
+    "гео": "geo",
+    "англ": "eng",
+    "нем": "ger",
+    "фр": "fren",
+    "фран": "fren",
+    "исп": "span",
+    "кит": "chi",
+    "лит": "lit",
+    **{name.lower(): subject for subject, name in SUBJECT_NAMES.items()},
+}
+
+MAX_SCORE = 100
+
+_ITEM_SEPARATOR = re.compile(r"[,;\n]+")
+_ITEM = re.compile(r"^(?P<name>[^\d:=]+?)\s*[:=]?\s*(?P<score>-?\d+)$")
+
+
+def parse_scores(text):
+    # "рус 85, мат_проф 90, инф 95" -> {"rus": 85, "math_prof": 90, ...}
+    scores = {}
+    errors = []
+    for item in _ITEM_SEPARATOR.split(text):
+        item = item.strip()
+        if not item:
+            continue
+
+        match = _ITEM.match(item)
+        if match is None:
+            errors.append(f"Не удалось разобрать «{item}»")
+            continue
+
+        name = " ".join(match["name"].lower().replace("ё", "е").split())
+        subject = SUBJECT_ALIASES.get(name) or SUBJECT_ALIASES.get(
+            name.replace(" ", "_")
+        )
+        score = int(match["score"])
+        if subject is None:
+            errors.append(f"Неизвестный предмет «{match['name'].strip()}»")
+        elif not 0 <= score <= MAX_SCORE:
+            errors.append(
+                f"Баллы для предмета {SUBJECT_NAMES[subject]} должны быть "
+                f"от 0 до {MAX_SCORE}"
+            )
+        elif subject in scores:
+            errors.append(
+                f"Предмет {SUBJECT_NAMES[subject]} указан несколько раз"
+            )
+        else:
+            scores[subject] = score
+    return scores, errors
@@ -0,0 +1,330 @@
+import asyncio
+from collections import defaultdict
+from html.parser import HTMLParser
+import logging
+import os
+import random
+import re
+from urllib.parse import quote, urljoin, urlsplit, urlunsplit
+
+import aiohttp
+
+from src.utils.normalize import parse_fee_info
+
+
+SITE_URL = "https://vuzopedia.ru"
+LISTING_URL = f"{SITE_URL}/region/city/59?page={{page}}"
+LISTING_PAGES = 16
+CATEGORIES_URL = f"{SITE_URL}/city/moskva"
+CATEGORY_COUNT = 24
+UNIVERSITIES_PER_PAGE = 10
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+VOID_ELEMENTS = frozenset(
+    (
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "source",
+        "track",
+        "wbr",
+    )
+)
+
+
+def page_filename(url):
+    # Имя файла сохраненной страницы: путь и query, по нему же страницу
+    # находит локальный сервер с фикстурами
+    parts = urlsplit(url)
+    name = parts.path.strip("/") or "index"
+    if parts.query:
+        name = f"{name}?{parts.query}"
+    return quote(name, safe="") + ".html"
+
+
+class Element:
+    __slots__ = ("parent_href", "parts")
+
+    def __init__(self, parent_href):
+        self.parent_href = parent_href
+        self.parts = []
+
+    @property
+    def text(self):
+        return "\n".join(self.parts)
+
+    @property
+    def title(self):
+        return " ".join(" ".join(self.parts).split())
+
+
+class ElementCollector(HTMLParser):
+    # Аналог find_elements(By.CLASS_NAME, ...) из Selenium: собирает текст
+    # элементов с заданными классами ("col-md-2.optionVuzNew" — оба класса)
+    # и href родителя, как find_element(By.XPATH, "..")
+    def __init__(self, *selectors):
+        super().__init__(convert_charrefs=True)
+        self.selectors = {
+            selector: frozenset(selector.split(".")) for selector in selectors
+        }
+        self.elements = {selector: [] for selector in selectors}
+        self._stack = []
+        self._open = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = frozenset((attrs.get("class") or "").split())
+        parent = self._stack[-1][1] if self._stack else {}
+        found = []
+        for selector, required in self.selectors.items():
+            if required <= classes:
+                element = Element(parent.get("href"))
+                self.elements[selector].append(element)
+                found.append(element)
+        self._open.extend(found)
+        if tag not in VOID_ELEMENTS:
+            self._stack.append((tag, attrs, found))
+
+    def handle_endtag(self, tag):
+        # Незакрытые теги (<p>, <li>) закрываются вместе с родителем
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                for _, _, found in self._stack[index:]:
+                    for element in found:
+                        self._open.remove(element)
+                del self._stack[index:]
+                return
+
+    def handle_data(self, data):
+        if self._stack and self._stack[-1][0] in ("script", "style"):
+            return
+        data = data.strip()
+        if data:
+            for element in self._open:
+                element.parts.append(data)
+
+    @classmethod
+    def collect(cls, html, *selectors):
+        collector = cls(*selectors)
+        collector.feed(html)
+        collector.close()
+        return [collector.elements[selector] for selector in selectors]
+
+
+def parse_listing(html, page_url):
+    titles, fees = ElementCollector.collect(
+        html, "itemVuzTitle", "col-md-2.optionVuzNew"
+    )
+    universities = []
+    # Вузы без блока с местами и баллами пропускаются
+    for title, fee in zip(titles, fees):
+        if title.parent_href:
+            url = urljoin(page_url, title.parent_href)
+        else:
+            logging.warning(f"No link for university '{title.title}'.")
+            url = "нет данных"
+        universities.append(
+            {"name": title.title, "url": url, **parse_fee_info(fee.text)}
+        )
+    return universities
+
+
+def parse_categories(html, page_url, limit=CATEGORY_COUNT):
+    titles, counts, items = ElementCollector.collect(
+        html, "vuzItemTitle", "cyrCountVUz", "teloVuzItemMain"
+    )
+    categories = []
+    for title, count, item in list(zip(titles, counts, items))[:limit]:
+        url = urljoin(page_url, item.parent_href)
+        numbers = re.findall(r"\d+", count.text)
+        categories.append(
+            {
+                "title": title.title,
+                "name": url.split("s=")[-1],
+                "count": int(numbers[0]) if numbers else 0,
+                "url": url,
+            }
+        )
+    return categories
+
+
+def parse_category_page(html):
+    (titles,) = ElementCollector.collect(html, "itemVuzTitle")
+    return [title.title for title in titles]
+
+
+class HostRateLimiter:
+    # Не больше rate запросов в секунду к каждому хосту; время следующего
+    # запроса резервируется сразу, поэтому блокировка не нужна
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = defaultdict(float)
+
+    async def wait(self, host):
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next[host])
+        self._next[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class Fetcher:
+    def __init__(
+        self,
+        base_url=SITE_URL,
+        concurrency=8,
+        rate=2.0,
+        retries=3,
+        backoff=1.0,
+        timeout=30.0,
+        save_dir=None,
+    ):
+        # base_url подменяет адрес сайта, например на сервер с фикстурами
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.save_dir = save_dir
+        self.limiter = HostRateLimiter(rate)
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        # Одна сессия на весь обход: соединения с сайтом переиспользуются
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    def url(self, site_url):
+        site = urlsplit(site_url)
+        base = urlsplit(self.base_url)
+        return urlunsplit(
+            (base.scheme, base.netloc, site.path, site.query, "")
+        )
+
+    def _save(self, site_url, html):
+        if self.save_dir is None:
+            return
+        os.makedirs(self.save_dir, exist_ok=True)
+        path = os.path.join(self.save_dir, page_filename(site_url))
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(html)
+
+    async def fetch(self, site_url):
+        url = self.url(site_url)
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                await self.limiter.wait(host)
+                self.requests += 1
+                try:
+                    async with self._session.get(url) as response:
+                        if response.status in RETRY_STATUSES:
+                            retry_after = response.headers.get("Retry-After")
+                            error = aiohttp.ClientResponseError(
+                                response.request_info,
+                                response.history,
+                                status=response.status,
+                                message=response.reason or "",
+                            )
+                        else:
+                            # Остальные ошибки HTTP не повторяются
+                            response.raise_for_status()
+                            html = await response.text()
+                            self._save(site_url, html)
+                            return html
+                except (
+                    aiohttp.ClientConnectionError,
+                    aiohttp.ClientPayloadError,
+                    asyncio.TimeoutError,
+                ) as e:
+                    error = e
+
+            if attempt == self.retries:
+                break
+            # Экспоненциальная задержка со случайным разбросом, пауза идет
+            # вне семафора и не занимает слот других запросов
+            delay = self.backoff * 2**attempt * random.uniform(0.5, 1.5)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            self.retried += 1
+            logging.warning(
+                f"Retrying {url} in {delay:.1f} s: "
+                f"{str(error) or type(error).__name__}"
+            )
+            await asyncio.sleep(delay)
+
+        self.failed += 1
+        raise error
+
+
+async def scrape(
+    fetcher, listing_pages=LISTING_PAGES, category_count=CATEGORY_COUNT
+):
+    # Возвращает вузы из списка и {категория: названия вузов} в том же
+    # порядке, что и последовательный обход
+    listing_urls = [
+        LISTING_URL.format(page=page) for page in range(1, listing_pages + 1)
+    ]
+    *listings, categories_page = await asyncio.gather(
+        *(fetcher.fetch(url) for url in listing_urls),
+        fetcher.fetch(CATEGORIES_URL),
+    )
+    universities = [
+        university
+        for url, html in zip(listing_urls, listings)
+        for university in parse_listing(html, url)
+    ]
+    categories = parse_categories(
+        categories_page, CATEGORIES_URL, category_count
+    )
+
+    async def category_names(category):
+        total_pages = -(-category["count"] // UNIVERSITIES_PER_PAGE)
+        pages = await asyncio.gather(
+            *(
+                fetcher.fetch(f"{category['url']}&page={page}")
+                for page in range(1, total_pages + 1)
+            )
+        )
+        return [name for html in pages for name in parse_category_page(html)]
+
+    names = await asyncio.gather(
+        *(category_names(category) for category in categories)
+    )
+    logging.info(
+        f"Scraped {len(universities)} universities and {len(categories)} "
+        f"categories with {fetcher.requests} requests "
+        f"({fetcher.retried} retries)."
+    )
+    return universities, {
+        category["name"]: universities_in_category
+        for category, universities_in_category in zip(categories, names)
+    }
+
+
+def create_fetcher():
+    save_dir = os.getenv("SCRAPER_SAVE_DIR")
+    return Fetcher(
+        base_url=os.getenv("SCRAPER_BASE_URL", SITE_URL),
+        concurrency=int(os.getenv("SCRAPER_CONCURRENCY", "8")),
+        rate=float(os.getenv("SCRAPER_RATE", "2")),
+        retries=int(os.getenv("SCRAPER_RETRIES", "3")),
+        save_dir=save_dir or None,
+    )
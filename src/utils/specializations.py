@@ -0,0 +1,42 @@
+from src.app.keyboards import specialization_mapping
+
+
+# Номер бита определяется порядком в specialization_mapping,
+# новые специальности добавляются только в конец словаря
+SPECIALIZATION_BITS = {
+    column: 1 << bit
+    for bit, column in enumerate(specialization_mapping.values())
+}
+SPECIALIZATION_NAMES = {
+    column: name for name, column in specialization_mapping.items()
+}
+
+
+def encode_specializations(columns):
+    mask = 0
+    for column in columns:
+        mask |= SPECIALIZATION_BITS.get(column, 0)
+    return mask
+
+
+def decode_specializations(mask):
+    return [
+        column for column, bit in SPECIALIZATION_BITS.items() if mask & bit
+    ]
+
+
+def specialization_names(mask):
+    return [
+        SPECIALIZATION_NAMES[column]
+        for column in decode_specializations(mask or 0)
+    ]
+
+
+def mask_expression(columns):
+    # SQL-выражение, собирающее маску из старых BOOLEAN-столбцов
+    terms = [
+        f"(CASE WHEN {column} THEN {SPECIALIZATION_BITS[column]} ELSE 0 END)"
+        for column in columns
+        if column in SPECIALIZATION_BITS
+    ]
+    return " + ".join(terms) if terms else "0"
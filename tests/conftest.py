@@ -0,0 +1,14 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+
+# Модули БД создают движки при импорте по URL из окружения: тесты работают
+# с временными файлами SQLite, а не с базами из .env
+_database_dir = tempfile.mkdtemp(prefix="bot-tests-")
+atexit.register(shutil.rmtree, _database_dir, True)
+os.environ["USER_SQL_URL"] = f"sqlite+aiosqlite:///{_database_dir}/users.db"
+os.environ["UNIV_SQL_URL"] = (
+    f"sqlite+aiosqlite:///{_database_dir}/universities.db"
+)
@@ -0,0 +1,16 @@
+import pytest
+
+from src.app.admin import parse_profile_args
+
+
+def test_parse_profile_args():
+    assert parse_profile_args(None, 600) == ("cprofile", 30.0, None)
+    assert parse_profile_args("sample 120 200u", 600) == ("sample", 120.0, 200)
+
+
+@pytest.mark.parametrize(
+    "args", ["-5", "0", "nan", "inf", "-inf", "601", "abc"]
+)
+def test_parse_profile_args_rejects_bad_seconds(args):
+    with pytest.raises(ValueError):
+        parse_profile_args(args, 600)
@@ -0,0 +1,86 @@
+import asyncio
+import types
+
+from aiogram.fsm.storage.base import StorageKey
+
+from src.db import fsm_storage
+from src.db.fsm_storage import BoundedMemoryStorage, parse_state_ttls
+
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+OTHER_KEY = StorageKey(bot_id=1, chat_id=20, user_id=20)
+
+
+def test_bounded_lru_eviction():
+    async def run():
+        storage = BoundedMemoryStorage(max_entries=2)
+        keys = [
+            StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+            for user_id in range(3)
+        ]
+        await storage.set_state(keys[0], "Form:city")
+        await storage.set_state(keys[1], "Form:city")
+        # Чтение делает первого пользователя недавно активным
+        await storage.get_state(keys[0])
+        await storage.set_state(keys[2], "Form:subject")
+
+        assert storage.size == 2
+        assert await storage.get_state(keys[1]) is None
+        assert await storage.get_state(keys[0]) == "Form:city"
+        assert storage.evictions == {("lru", "Form:city"): 1}
+
+    asyncio.run(run())
+
+
+def test_bounded_state_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(
+        fsm_storage, "time", types.SimpleNamespace(monotonic=lambda: now[0])
+    )
+
+    async def run():
+        storage = BoundedMemoryStorage(
+            idle_ttl=600,
+            state_ttls=parse_state_ttls("waiting_for_budget_choice=60"),
+        )
+        await storage.set_state(KEY, "waiting_for_budget_choice")
+        await storage.set_data(KEY, {"search": {"ids": "AAAA"}})
+        await storage.set_state(OTHER_KEY, "Form:city")
+
+        now[0] += 61
+        assert storage.sweep() == 1
+        # Как в FSM middleware: состояние читается раньше данных
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+        assert await storage.get_state(OTHER_KEY) == "Form:city"
+
+        # Обращение продлевает запись, истекает она при чтении
+        now[0] += 599
+        assert await storage.get_state(OTHER_KEY) == "Form:city"
+        now[0] += 600
+        assert await storage.get_state(OTHER_KEY) is None
+        assert storage.evictions == {
+            ("expired", "waiting_for_budget_choice"): 1,
+            ("expired", "Form:city"): 1,
+        }
+
+    asyncio.run(run())
+
+
+def test_bounded_compact_encoding():
+    async def run():
+        storage = BoundedMemoryStorage(compress_min_size=64)
+        data = {"search": {"ids": "A" * 1000}, "city": "Москва"}
+        await storage.set_data(KEY, data)
+        await storage.set_data(OTHER_KEY, {"a": 1})
+
+        assert await storage.get_data(KEY) == data
+        assert await storage.get_data(OTHER_KEY) == {"a": 1}
+        stats = await storage.stats()
+        assert stats[""]["bytes"] < 200
+
+        # Пустые состояние и данные удаляют запись
+        await storage.set_data(KEY, {})
+        assert storage.size == 1
+
+    asyncio.run(run())
@@ -0,0 +1,67 @@
+from src.db.catalog import (
+    pack_ids,
+    ScoreIndex,
+    University,
+    UniversityCatalog,
+    unpack_ids,
+)
+
+
+MVD = 0b001
+IT = 0b010
+MEDICINE = 0b100
+
+
+def make_index():
+    return ScoreIndex(
+        [
+            (200.0, 1, IT),
+            (150.0, 2, MVD),
+            (250.0, 3, IT | MEDICINE),
+            (150.0, 0, IT),
+            (300.0, 4, MVD),
+        ]
+    )
+
+
+def test_below_orders_by_descending_score():
+    index = make_index()
+    # Равные баллы идут по ID, порог включается
+    assert list(index.below(250)) == [3, 1, 0, 2]
+    assert list(index.below(249.9)) == [1, 0, 2]
+    assert list(index.below(1000)) == [4, 3, 1, 0, 2]
+    assert list(index.below(100)) == []
+
+
+def test_below_filters_by_mask():
+    index = make_index()
+    assert list(index.below(250, IT)) == [3, 1, 0]
+    assert list(index.below(250, MVD)) == [2]
+    assert list(index.below(300, MVD | MEDICINE)) == [4, 3, 2]
+    assert list(index.below(200, MEDICINE)) == []
+
+
+def test_catalog_build_and_page():
+    catalog = UniversityCatalog()
+    catalog.build(
+        (
+            University(
+                university_id, f"Вуз {university_id}", *[None] * 6, mask
+            ),
+            bud_score,
+            pay_score,
+        )
+        for university_id, mask, bud_score, pay_score in [
+            (1, IT, 200.0, 150.0),
+            (2, MVD, None, 120.0),
+            (3, IT, 180.0, None),
+        ]
+    )
+    assert list(catalog.search_budget(210)) == [1, 3]
+    assert list(catalog.search_paid(210, MVD)) == [2]
+
+    ids = unpack_ids(pack_ids(catalog.search_paid(210)))
+    assert list(ids) == [1, 2]
+    # Вуз, пропавший после обновления каталога, не попадает на страницу
+    del catalog.universities[1]
+    assert [university.ID for university in catalog.page(ids, 0)] == [2]
@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+import pytest
+
+from benchmarks.fake_redis import FakeRedisServer
+from src.db import fsm_storage
+from src.db.fsm_storage import RedisHashStorage, SQLiteStorage, storage_stats
+
+
+# Хранилища проверяются через asyncio.run: pytest-asyncio не нужен
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+OTHER_KEY = StorageKey(bot_id=1, chat_id=20, user_id=20)
+
+
+def run_with_storage(backend, tmp_path, check, **kwargs):
+    async def run():
+        if backend == "redis":
+            async with FakeRedisServer() as server:
+                storage = RedisHashStorage.from_url(
+                    server.url, protocol=2, **kwargs
+                )
+                try:
+                    await check(storage, server)
+                finally:
+                    await storage.close()
+        else:
+            storage = SQLiteStorage(str(tmp_path / "fsm.sqlite3"))
+            try:
+                await check(storage, None)
+            finally:
+                await storage.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("backend", ["redis", "sqlite"])
+def test_round_trip(backend, tmp_path):
+    async def check(storage, server):
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+
+        await storage.set_state(KEY, "Form:city")
+        await storage.set_data(KEY, {"city": "Москва", "ids": [1, 2]})
+        assert await storage.get_state(KEY) == "Form:city"
+        assert await storage.get_data(KEY) == {
+            "city": "Москва",
+            "ids": [1, 2],
+        }
+        assert await storage.get_state(OTHER_KEY) is None
+
+        # state.clear() в aiogram: сброс состояния и пустые данные
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+
+    run_with_storage(backend, tmp_path, check)
+
+
+@pytest.mark.parametrize("backend", ["redis", "sqlite"])
+def test_data_without_prefetch(backend, tmp_path):
+    async def check(storage, server):
+        await storage.set_data(KEY, {"a": 1})
+        await storage.set_data(OTHER_KEY, {"b": 2})
+        # Данные другого пользователя не берутся из предзагрузки
+        assert await storage.get_data(KEY) == {"a": 1}
+        assert await storage.get_state(OTHER_KEY) is None
+        assert await storage.get_data(KEY) == {"a": 1}
+
+    run_with_storage(backend, tmp_path, check)
+
+
+def test_prefetch_storage_requires_read_and_write():
+    class IncompleteStorage(fsm_storage.PrefetchStorage):
+        async def _read(self, storage_key):
+            return None, {}
+
+        async def close(self):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteStorage()
+
+
+def test_redis_state_ttl(tmp_path):
+    async def check(storage, server):
+        await storage.set_state(KEY, "Form:city")
+        (redis_key,) = server.hashes
+        assert server.expires[redis_key] > time.monotonic()
+
+        server.expires[redis_key] = time.monotonic() - 1
+        assert await storage.get_state(KEY) is None
+
+    run_with_storage("redis", tmp_path, check, state_ttl=60)
+
+
+def test_sqlite_stats(tmp_path):
+    async def check(storage, server):
+        await storage.set_state(KEY, "Form:city")
+        await storage.set_data(KEY, {"city": "Москва"})
+        await storage.set_state(OTHER_KEY, "Form:city")
+        stats = await storage_stats(storage)
+        assert stats["Form:city"]["entries"] == 2
+        assert stats["Form:city"]["bytes"] > 0
+
+    run_with_storage("sqlite", tmp_path, check)
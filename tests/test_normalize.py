@@ -0,0 +1,66 @@
+import pytest
+
+from src.utils.normalize import (
+    normalize_university,
+    parse_fee_info,
+    parse_number,
+    parse_score,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("120 000 ₽", 120000),
+        ("120\u00a0000\u00a0₽", 120000),
+        ("15 мест", 15),
+        ("150 000 – 300 000 ₽", 150000),
+        ("от 99 000 ₽", 99000),
+        ("нет данных", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("от 245", 245.0),
+        ("от 67.5", 67.5),
+        ("от ?", None),
+        ("от -", None),
+        ("нет данных", None),
+        (None, None),
+    ],
+)
+def test_parse_score(value, expected):
+    assert parse_score(value) == expected
+
+
+def test_parse_fee_info_sections():
+    info = parse_fee_info(
+        "250 000 ₽\nБюджет\n120 мест\nот 270\nПлатное\n300 мест\nот 180"
+    )
+    assert info == {
+        "coast": "250 000 ₽",
+        "bud_places": "120 мест",
+        "bud_score": "от 270",
+        "pay_places": "300 мест",
+        "pay_score": "от 180",
+    }
+    assert normalize_university(
+        info["coast"],
+        info["bud_places"],
+        info["pay_places"],
+        info["bud_score"],
+        info["pay_score"],
+    ) == {
+        "coast_num": 250000,
+        "bud_places_num": 120,
+        "pay_places_num": 300,
+        "bud_score_num": 270.0,
+        "pay_score_num": 180.0,
+    }
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from src.db.engines import dispose_engines
+from src.db.profiles import _scores_upsert, ProfileStore
+from src.db.schema import SchemaRegistry
+from src.db.users import create_tables, SessionLocalUsers, Subject
+from src.utils.specializations import SPECIALIZATION_BITS
+
+
+TG_ID = 100
+
+
+def run_with_tables(check):
+    async def run():
+        await create_tables()
+        try:
+            await check()
+        finally:
+            # Пул соединений привязан к циклу событий, а asyncio.run
+            # создает новый цикл в каждом тесте
+            await dispose_engines()
+
+    asyncio.run(run())
+
+
+async def upsert_scores(scores):
+    async with SessionLocalUsers() as session:
+        async with session.begin():
+            await session.execute(
+                _scores_upsert(tuple(sorted(scores))),
+                [{"tg_id": TG_ID, **scores}],
+            )
+
+
+async def load_subject():
+    async with SessionLocalUsers() as session:
+        return await session.scalar(select(Subject).filter_by(tg_id=TG_ID))
+
+
+def test_scores_upsert_keeps_sum_count_and_mean():
+    async def check():
+        await upsert_scores({"sub_rus": 80, "sub_math": 90})
+        subject = await load_subject()
+        assert (subject.score_sum, subject.score_count) == (170, 2)
+        assert subject.mean_value == 255
+
+        # Замена балла не меняет количество, новый предмет добавляется
+        await upsert_scores({"sub_rus": 60, "sub_inf": 100})
+        subject = await load_subject()
+        assert (subject.sub_rus, subject.sub_math, subject.sub_inf) == (
+            60,
+            90,
+            100,
+        )
+        assert (subject.score_sum, subject.score_count) == (250, 3)
+        assert subject.mean_value == 250
+
+    run_with_tables(check)
+
+
+def test_scores_after_clear():
+    async def check():
+        profiles = ProfileStore(SchemaRegistry())
+        assert await profiles.set_scores(TG_ID, {"rus": 80, "math": 90}) == 255
+        await profiles.clear(TG_ID)
+        assert await load_subject() is None
+
+        # После очистки сумма и количество считаются заново
+        assert await profiles.set_scores(TG_ID, {"inf": 70}) == 210
+        subject = await load_subject()
+        assert (subject.score_sum, subject.score_count) == (70, 1)
+        assert subject.sub_rus is None
+        assert subject.mean_value == 210
+
+    run_with_tables(check)
+
+
+def test_write_behind_reads_own_writes():
+    async def check():
+        profiles = ProfileStore(SchemaRegistry(), write_behind=True)
+        await profiles.set_city(TG_ID, "Москва")
+        assert await profiles.set_scores(TG_ID, {"rus": 80}) == 240
+        await profiles.add_specialization(TG_ID, "spec_mvd")
+
+        # Без кэша профиль собирается из БД и несохраненных изменений
+        profiles._entries.clear()
+        profile = await profiles.get(TG_ID)
+        assert profile.city == "Москва"
+        assert profile.scores == {"sub_rus": 80}
+        assert profile.specialization_mask == SPECIALIZATION_BITS["spec_mvd"]
+        assert await load_subject() is None
+        assert profiles.pending_users == 1
+
+        await profiles.flush()
+        assert profiles.pending_users == 0
+        profiles._entries.clear()
+        assert await profiles.get(TG_ID) == profile
+        assert (await load_subject()).sub_rus == 80
+
+    run_with_tables(check)
+
+
+def test_failed_flush_keeps_pending_changes():
+    async def check():
+        profiles = ProfileStore(SchemaRegistry(), write_behind=True)
+        await profiles.set_scores(TG_ID, {"rus": 80, "math": 70})
+        execute = profiles._execute
+
+        async def failing_execute(session, changes):
+            # Изменение, сделанное во время сброса, новее сбрасываемого
+            await profiles.set_scores(TG_ID, {"rus": 90})
+            raise ConnectionError
+
+        profiles._execute = failing_execute
+        with pytest.raises(ConnectionError):
+            await profiles.flush()
+        assert profiles.pending_users == 1
+        assert await load_subject() is None
+
+        profiles._execute = execute
+        await profiles.flush()
+        subject = await load_subject()
+        assert (subject.sub_rus, subject.sub_math) == (90, 70)
+        assert subject.mean_value == 240
+
+    run_with_tables(check)
@@ -0,0 +1,47 @@
+import pytest
+
+from src.utils.scores import parse_scores
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "рус 85, мат_проф 90, инф 95",
+            {"rus": 85, "math_prof": 90, "inf": 95},
+        ),
+        (
+            "Русский: 80; Математика профильная = 70",
+            {"rus": 80, "math_prof": 70},
+        ),
+        ("мат проф 90\nфиз 75", {"math_prof": 90, "phy": 75}),
+        ("ХИМ 60, фр 55, мат_баз 40", {"chem": 60, "fren": 55, "math": 40}),
+        ("англ 100,, лит 0", {"eng": 100, "lit": 0}),
+    ],
+)
+def test_parse_scores_aliases(text, expected):
+    assert parse_scores(text) == (expected, [])
+
+
+@pytest.mark.parametrize(
+    "text, error",
+    [
+        ("рус", "Не удалось разобрать «рус»"),
+        ("85", "Не удалось разобрать «85»"),
+        ("рус 8 5", "Не удалось разобрать «рус 8 5»"),
+        ("астрономия 90", "Неизвестный предмет «астрономия»"),
+        ("рус 101", "Баллы для предмета Русский должны быть от 0 до 100"),
+        ("инф -5", "Баллы для предмета Информатика должны быть от 0 до 100"),
+        ("рус 80, Русский 90", "Предмет Русский указан несколько раз"),
+    ],
+)
+def test_parse_scores_rejects(text, error):
+    _, errors = parse_scores(text)
+    assert errors == [error]
+
+
+def test_parse_scores_keeps_valid_items():
+    scores, errors = parse_scores("рус 85, гео 150, инф 95")
+    assert scores == {"rus": 85, "inf": 95}
+    assert len(errors) == 1
+    assert parse_scores("") == ({}, [])
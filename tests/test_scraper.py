@@ -0,0 +1,65 @@
+import random
+
+from benchmarks.fake_site import synthetic_site
+from src.utils.scraper import (
+    CATEGORIES_URL,
+    LISTING_PAGES,
+    LISTING_URL,
+    page_filename,
+    parse_categories,
+    parse_category_page,
+    parse_listing,
+    UNIVERSITIES_PER_PAGE,
+)
+
+
+def test_parse_listing_matches_synthetic_site():
+    pages, universities, _ = synthetic_site(random.Random(0))
+    parsed = []
+    for page in range(1, LISTING_PAGES + 1):
+        url = LISTING_URL.format(page=page)
+        parsed.extend(parse_listing(pages[page_filename(url)], url))
+
+    assert parsed == universities
+    # Вузы без ссылки сохраняются с "нет данных", как при обходе Selenium
+    assert any(university["url"] == "нет данных" for university in parsed)
+
+
+def test_parse_categories_matches_synthetic_site():
+    pages, _, categories = synthetic_site(random.Random(1))
+    parsed = parse_categories(
+        pages[page_filename(CATEGORIES_URL)], CATEGORIES_URL
+    )
+
+    assert [category["name"] for category in parsed] == list(categories)
+    for category in parsed:
+        names = categories[category["name"]]
+        assert category["count"] == len(names)
+        pages_count = -(-len(names) // UNIVERSITIES_PER_PAGE)
+        assert [
+            name
+            for page in range(1, pages_count + 1)
+            for name in parse_category_page(
+                pages[page_filename(f"{category['url']}&page={page}")]
+            )
+        ] == names
+
+
+def test_parse_listing_skips_items_without_fee_block():
+    html = (
+        "<div><a href='/vuz/1'><div class='itemVuzTitle'>Первый</div></a>"
+        "<div class='col-md-2 optionVuzNew'><p>100 000 ₽<p>Платное"
+        "<p>10 мест<p>от 150</div></div>"
+        "<div class='itemVuzTitle'>Без блока</div>"
+    )
+    assert parse_listing(html, LISTING_URL.format(page=1)) == [
+        {
+            "name": "Первый",
+            "url": "https://vuzopedia.ru/vuz/1",
+            "coast": "100 000 ₽",
+            "bud_places": None,
+            "bud_score": None,
+            "pay_places": "10 мест",
+            "pay_score": "от 150",
+        }
+    ]